@@ -1,6 +1,6 @@
 import csv
+import io
 import logging
-import os
 from random import randint
 from time import time
 from typing import cast
@@ -33,6 +33,8 @@ from tudelft_utilities_logging.ReportToLogger import ReportToLogger
 from tudelft.utilities.immutablelist.ImmutableList import ImmutableList
 from decimal import Decimal
 
+from agents.template_agent.utils.agent_storage import AgentStorage
+
 
 
 class AgentFO2(DefaultParty):
@@ -47,6 +49,7 @@ class AgentFO2(DefaultParty):
         self.me: PartyId = None
         self.other: str = None
         self.settings: Settings = None
+        self.storage: AgentStorage = None
         self.storage_dir: str = None
         self.allbid:BidsWithUtility = None
 
@@ -87,6 +90,8 @@ class AgentFO2(DefaultParty):
 
             self.parameters = self.settings.getParameters()
             self.storage_dir = self.parameters.get("storage_dir")
+            if self.storage_dir is not None:
+                self.storage = AgentStorage(self.storage_dir)
 
             # the profile contains the preferences of the agent over the domain
             profile_connection = ProfileConnectionFactory.create(
@@ -109,11 +114,10 @@ class AgentFO2(DefaultParty):
                 self.other = str(actor).split("_")[-2]
 
                 # read data
-                if self.read_data and os.path.exists(f"{self.storage_dir}/{self.other}.csv"):
-                    with open(f"{self.storage_dir}/{self.other}.csv","r") as f:
-                        reader=csv.reader(f)
-                        l=[row for row in reader]
-                        l=[[float(v) for v in row] for row in l]
+                if self.read_data and self.storage is not None and self.storage.exists(f"{self.other}.csv"):
+                    reader=csv.reader(io.StringIO(self.storage.read_text(f"{self.other}.csv")))
+                    l=[row for row in reader]
+                    l=[[float(v) for v in row] for row in l]
                     self.pre_opponent_utility_log=l[0]
                     self.pre_opponent_bid_hamming=l[1]
                     self.which_pre_accept=l[2]
@@ -298,12 +302,17 @@ class AgentFO2(DefaultParty):
         Taking too much time might result in your agent being killed, so use it for storage only.
         """
 
-        with open(f"{self.storage_dir}/{self.other}.csv", "w") as f:
-            writer=csv.writer(f)
-            writer.writerow(self.opponent_utility_log)
-            writer.writerow(self.opponent_bid_hamming)
-            writer.writerow(self.which_accept)
-            writer.writerow([self.opponent_strategy,self.min])
+        if self.storage is None:
+            return
+
+        # write the rows to memory first, so the file can be replaced atomically
+        f=io.StringIO()
+        writer=csv.writer(f)
+        writer.writerow(self.opponent_utility_log)
+        writer.writerow(self.opponent_bid_hamming)
+        writer.writerow(self.which_accept)
+        writer.writerow([self.opponent_strategy,self.min])
+        self.storage.write_text(f"{self.other}.csv", f.getvalue())
 
 
     def accept_condition(self, bid: Bid) -> bool:
@@ -2,7 +2,6 @@
 # author: Arash Ebrahimnezhad
 # Email: Arash.ebrah@gmail.com
 #######################################################
-import json
 import logging
 from random import randint
 import random
@@ -11,7 +10,6 @@ from tkinter.messagebox import NO
 from typing import cast
 import math
 import pickle
-import os
 from statistics import mean
 from geniusweb.actions.Accept import Accept
 from geniusweb.actions.Action import Action
@@ -37,6 +35,7 @@ from geniusweb.progress.ProgressTime import ProgressTime
 from geniusweb.references.Parameters import Parameters
 from tudelft_utilities_logging.ReportToLogger import ReportToLogger
 from tudelft.utilities.immutablelist.ImmutableList import ImmutableList
+from agents.template_agent.utils.agent_storage import AgentStorage
 from .utils.opponent_model import OpponentModel
 from geniusweb.profile.utilityspace.LinearAdditive import LinearAdditive
 from agents.time_dependent_agent.extended_util_space import ExtendedUtilSpace
@@ -63,6 +62,7 @@ class LuckyAgent2022(DefaultParty):
         self.me: PartyId = None
         self.other: str = None
         self.settings: Settings = None
+        self.storage: AgentStorage = None
         self.storage_dir: str = None
 
         self.last_received_bid: Bid = None
@@ -105,7 +105,7 @@ class LuckyAgent2022(DefaultParty):
         return m
 
     def set_parameters(self, opp):
-        if not self.other or not os.path.exists(f"{self.storage_dir}/m_data_{self.other}"):
+        if not self.other or self.storage is None or not self.storage.exists(f"m_data_{self.other}"):
             self.min = 0.6
             self.e = 0.05
         else:
@@ -204,11 +204,7 @@ class LuckyAgent2022(DefaultParty):
                 self.e = 0.05
 
     def return_saved_data(self, file_name):
-        # for reading also binary mode is important
-        file = open(f"{self.storage_dir}/{file_name}", 'rb')
-        saved_data = json.load(file)
-        file.close()
-        return saved_data
+        return self.storage.read_json(file_name)
 
     def notifyChange(self, data: Inform):
         """MUST BE IMPLEMENTED
@@ -229,6 +225,8 @@ class LuckyAgent2022(DefaultParty):
 
             self.parameters = self.settings.getParameters()
             self.storage_dir = self.parameters.get("storage_dir")
+            if self.storage_dir is not None:
+                self.storage = AgentStorage(self.storage_dir)
 
             # the profile contains the preferences of the agent over the domain
             profile_connection = ProfileConnectionFactory.create(
@@ -369,56 +367,27 @@ class LuckyAgent2022(DefaultParty):
         """
         # **************************************************
 
-        c_data = {}
-        if os.path.isfile(f"{self.storage_dir}/c_data_{self.other}"):
-            # OLD
-            # dbfile_c = open(f"{self.storage_dir}/c_data", 'rb')
-            # c_data = pickle.load(dbfile_c)
-            # dbfile_c.close()
-            # NEW
-            with open(f"{self.storage_dir}/c_data_{self.other}", 'r') as dbfile_c:
-                c_data = json.load(dbfile_c)
-
-        if os.path.exists(f"{self.storage_dir}/c_data_{self.other}"):
-            os.remove(f"{self.storage_dir}/c_data_{self.other}")
-
-        c_data[self.other] = self.condition_d
-        # OLD
-        # dbfile_c = open(f"{self.storage_dir}/c_data", 'ab')
-        # pickle.dump(c_data, dbfile_c)
-        # dbfile_c.close()
-        # NEW
-        with open(f"{self.storage_dir}/c_data_{self.other}", 'w') as dbfile_c:
-            json.dump(c_data, dbfile_c, indent=2)
-
-        m_data = {}
-        if os.path.isfile(f"{self.storage_dir}/m_data_{self.other}"):
-            # OLD
-            # dbfile = open(f"{self.storage_dir}/m_data", 'rb')
-            # m_data = pickle.load(dbfile)
-            # dbfile.close()
-            # NEW
-            with open(f"{self.storage_dir}/m_data_{self.other}", 'r') as dbfile:
-                m_data = json.load(dbfile)
-
-
-        if os.path.exists(f"{self.storage_dir}/m_data_{self.other}"):
-            os.remove(f"{self.storage_dir}/m_data_{self.other}")
-
-        m_tuple = (self.agreement_utility, self.min, self.e)
-        if self.other in m_data:
-            m_data[self.other].append(m_tuple)
-        else:
-            m_data[self.other] = [m_tuple, ]
-
-        # OLD
-        # dbfile = open(f"{self.storage_dir}/m_data", 'ab')
-        # # source, destination
-        # pickle.dump(m_data, dbfile)
-        # dbfile.close()
-        # NEW
-        with open(f"{self.storage_dir}/m_data_{self.other}", 'w') as dbfile:
-            json.dump(m_data, dbfile, indent=2)
+        if self.storage is None or not self.other:
+            return
+
+        # NOTE: Sessions against the same opponent may run in parallel. The files are
+        # updated while holding their lock and replaced atomically, so no session
+        # reads a truncated file or loses the update of another session.
+        def update_c_data(c_data):
+            c_data[self.other] = self.condition_d
+            return c_data
+
+        self.storage.update_json(f"c_data_{self.other}", update_c_data, default={}, indent=2)
+
+        def update_m_data(m_data):
+            m_tuple = (self.agreement_utility, self.min, self.e)
+            if self.other in m_data:
+                m_data[self.other].append(m_tuple)
+            else:
+                m_data[self.other] = [m_tuple, ]
+            return m_data
+
+        self.storage.update_json(f"m_data_{self.other}", update_m_data, default={}, indent=2)
 
     ###########################################################################################
     ################################## Example methods below ##################################
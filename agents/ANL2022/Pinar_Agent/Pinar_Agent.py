@@ -7,7 +7,6 @@ from geniusweb.actions.Accept import Accept
 from geniusweb.actions.Action import Action
 from geniusweb.actions.Offer import Offer
 from geniusweb.actions.PartyId import PartyId
-from geniusweb.bidspace.AllBidsList import AllBidsList
 from geniusweb.inform.ActionDone import ActionDone
 from geniusweb.inform.Finished import Finished
 from geniusweb.inform.Inform import Inform
@@ -82,11 +81,11 @@ class Pinar_Agent(DefaultParty):
             )
             self.profile = profile_connection.getProfile()
             self.domain = self.profile.getDomain()
-            all_bids = AllBidsList(self.domain)
-            if not self.sorted_bids:
-                self.sorted_bids = sorted(all_bids, key=lambda x: self.profile.getUtility(x),
-                                          reverse=True)
+            if self.parameters.get("lgb_train_budget_sec") is not None:
+                self.agent_brain.train_budget_sec = self.parameters.get("lgb_train_budget_sec")
             self.agent_brain.fill_domain_and_profile(self.domain, self.profile)
+            # the brain already sorted all bids on utility
+            self.sorted_bids = self.agent_brain.sorted_bids_agent
 
             profile_connection.close()
 
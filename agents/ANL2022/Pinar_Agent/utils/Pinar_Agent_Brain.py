@@ -1,5 +1,8 @@
 import json
 import random
+from time import perf_counter
+
+import numpy as np
 import pandas as pd
 import lightgbm as lgb
 
@@ -20,12 +23,18 @@ class Pinar_Agent_Brain:
         self.sorted_bids_agent_df = None
         self.reservationBid: Bid = None
         self.sorted_bids_agent = None
+        self.sorted_bids_agent_utilities = None
         self.sorted_bids_agent_that_greater_than_goal_of_utility = []
         self.all_bid_list = None
 
         self.param = None
 
         self.lgb_model = None
+        # the model is retrained every `train_every` unique offers, as long as the total time
+        # spent on retraining stays within `train_budget_sec` (None for no limit)
+        self.train_every = 2
+        self.train_budget_sec = None
+        self.train_time_spent = 0.0
 
         self.X = pd.DataFrame()
         self.Y = pd.DataFrame()
@@ -93,25 +102,20 @@ class Pinar_Agent_Brain:
         self.temEnumDict = self.enumerate_enum_dict()
         self.all_bid_list = AllBidsList(domain)
 
-        self.sorted_bids_agent = sorted(self.all_bid_list,
-                                        key=lambda x: self.profile.getUtility(x),
-                                        reverse=True)
+        # sort on utility once, and keep the utilities so that they are not computed again
+        bids_with_utility = sorted(((self.profile.getUtility(bid), bid) for bid in self.all_bid_list),
+                                   key=lambda x: x[0],
+                                   reverse=True)
+        self.sorted_bids_agent = [bid for _, bid in bids_with_utility]
+        self.sorted_bids_agent_utilities = np.array([float(utility) for utility, _ in bids_with_utility])
         self.calculate_percantage_and_number()
         self.add_agent_first_n_bid_to_machine_learning_with_low_utility(self.sorted_bids_agent)
 
     def calculate_percantage_and_number(self):
-        numb_95 = 0
-        numb_85 = 0
-        for i in self.sorted_bids_agent:
-            utility = float(self.profile.getUtility(i))
-            if utility > float(0.95):
-                numb_95 = numb_95 + 1
-            if utility > float(0.85):
-                numb_85 = numb_85 + 1
-            else:
-                break
-        self.number_of_bid_greater_than95 = numb_95
-        self.number_of_bid_greater_than85 = numb_85
+        # the bids are sorted on utility, so the bids above a utility are a prefix of them
+        utilities = self.sorted_bids_agent_utilities
+        self.number_of_bid_greater_than95 = int(np.count_nonzero(utilities > float(0.95)))
+        self.number_of_bid_greater_than85 = int(np.count_nonzero(utilities > float(0.85)))
 
         self.percentage_of_greater_than95 = float(self.number_of_bid_greater_than95) / float(
             len(self.sorted_bids_agent))
@@ -120,26 +124,15 @@ class Pinar_Agent_Brain:
 
         self.goal_of_utility = self.get_goal_of_negoation_utility(float(self.percentage_of_greater_than85)) + float(
             0.01)
-        numb_goal_util = 0
-        self.sorted_bids_agent_df = pd.DataFrame()
-        self.sorted_bids_agent_that_greater_than_065_df = pd.DataFrame()
-        for i in self.sorted_bids_agent:
-            utility = float(self.profile.getUtility(i))
-            if utility > float(self.goal_of_utility):
-                numb_goal_util = numb_goal_util + 1
-            if utility > (float(self.goal_of_utility) - float(0.1)):
-                self.sorted_bids_agent_that_greater_than_goal_of_utility.append(i)
-                df_temp = pd.DataFrame(self.get_bid_value_array_for_data_frame_usage(i))
-                df_temp = self.enumerate(df_temp)
-                self.sorted_bids_agent_df = pd.concat([self.sorted_bids_agent_df, df_temp])
-            if utility > 0.65:
-                self.sorted_bids_agent_that_greater_than_065.append(i)
-                df_temp = pd.DataFrame(self.get_bid_value_array_for_data_frame_usage(i))
-                df_temp = self.enumerate(df_temp)
-                self.sorted_bids_agent_that_greater_than_065_df = pd.concat(
-                    [self.sorted_bids_agent_that_greater_than_065_df, df_temp])
-            else:
-                break
+        # only the bids with a utility above 0.65 are considered
+        utilities = utilities[:int(np.count_nonzero(utilities > 0.65))]
+        numb_goal_util = int(np.count_nonzero(utilities > float(self.goal_of_utility)))
+        numb_goal_util_range = int(np.count_nonzero(utilities > (float(self.goal_of_utility) - float(0.1))))
+
+        self.sorted_bids_agent_that_greater_than_goal_of_utility.extend(self.sorted_bids_agent[:numb_goal_util_range])
+        self.sorted_bids_agent_df = self.bids_to_df(self.sorted_bids_agent[:numb_goal_util_range])
+        self.sorted_bids_agent_that_greater_than_065.extend(self.sorted_bids_agent[:len(utilities)])
+        self.sorted_bids_agent_that_greater_than_065_df = self.bids_to_df(self.sorted_bids_agent[:len(utilities)])
         self.number_of_goal_of_utility = numb_goal_util
 
     def evaluate_opponent_utility_for_all_my_important_bid(self, progress_time):
@@ -157,9 +150,12 @@ class Pinar_Agent_Brain:
 
     def evaluate_data_according_to_lig_gbm(self, progress_time):
         length = len(self.offers_unique)
-        if length >= 1 and (length % 2) == 0:
+        within_budget = self.train_budget_sec is None or self.train_time_spent < self.train_budget_sec
+        if length >= 1 and (length % self.train_every) == 0 and within_budget:
+            start = perf_counter()
             self.train_machine_learning_model()
             self.evaluate_opponent_utility_for_all_my_important_bid(progress_time)
+            self.train_time_spent += perf_counter() - start
 
     def train_machine_learning_model(self):
         issue_list = []
@@ -201,6 +197,15 @@ class Pinar_Agent_Brain:
         df_temp = self.enumerate(df_temp)
         return df_temp
 
+    def bids_to_df(self, bids):
+        """Integer encoded bids (see `enumerate`) as a frame with one column per issue,
+        built in one go instead of concatenating a frame per bid"""
+        columns = {}
+        for issue in self.issue_name_list:
+            issue_enums = self.temEnumDict[issue]
+            columns[issue] = np.array([issue_enums[bid.getValue(issue)] for bid in bids], dtype=np.int64)
+        return pd.DataFrame(columns)
+
     def enumerate_enum_dict(self):
         issue_enums_dict = {}
         for issue in self.domain.getIssues():
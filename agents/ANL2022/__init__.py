@@ -1,19 +1,41 @@
-from .agent007.agent007 import Agent007
-from .agent4410.agent_4410 import Agent4410
-from .agentfish.agentfish import AgentFish
-from .AgentFO2.AgentFO2 import AgentFO2
-from .BIU_agent.BIU_agent import BIU_agent
-from .charging_boul.charging_boul import ChargingBoul
-from .compromising_agent.compromising_agent import CompromisingAgent
-from .dreamteam109_agent.dreamteam109_agent import DreamTeam109Agent
-from .gea_agent.gea_agent import GEAAgent
-from .learning_agent.learning_agent import LearningAgent
-from .LuckyAgent2022.LuckyAgent2022 import LuckyAgent2022
-from .micro_agent.micro_agent.micro_agent import MiCROAgent
-from .Pinar_Agent.Pinar_Agent import Pinar_Agent
-from .procrastin_agent.procrastin_agent import ProcrastinAgent
-from .rg_agent.rg_agent import RGAgent
-from .smart_agent.smart_agent import SmartAgent
-from .super_agent.super_agent import SuperAgent
-from .thirdagent.third_agent import ThirdAgent
-from .tjaronchery10_agent.tjaronchery10_agent import Tjaronchery10Agent
+import importlib
+
+# NOTE: The agents are only imported when they are first accessed, as several of
+# them pull in heavy dependencies (sklearn, lightgbm, scipy) at import time.
+# Sessions import agents by their full class path, so most of them never need this.
+_AGENT_MODULES = {
+    "Agent007": ".agent007.agent007",
+    "Agent4410": ".agent4410.agent_4410",
+    "AgentFish": ".agentfish.agentfish",
+    "AgentFO2": ".AgentFO2.AgentFO2",
+    "BIU_agent": ".BIU_agent.BIU_agent",
+    "ChargingBoul": ".charging_boul.charging_boul",
+    "CompromisingAgent": ".compromising_agent.compromising_agent",
+    "DreamTeam109Agent": ".dreamteam109_agent.dreamteam109_agent",
+    "GEAAgent": ".gea_agent.gea_agent",
+    "LearningAgent": ".learning_agent.learning_agent",
+    "LuckyAgent2022": ".LuckyAgent2022.LuckyAgent2022",
+    "MiCROAgent": ".micro_agent.micro_agent.micro_agent",
+    "Pinar_Agent": ".Pinar_Agent.Pinar_Agent",
+    "ProcrastinAgent": ".procrastin_agent.procrastin_agent",
+    "RGAgent": ".rg_agent.rg_agent",
+    "SmartAgent": ".smart_agent.smart_agent",
+    "SuperAgent": ".super_agent.super_agent",
+    "ThirdAgent": ".thirdagent.third_agent",
+    "Tjaronchery10Agent": ".tjaronchery10_agent.tjaronchery10_agent",
+}
+
+__all__ = list(_AGENT_MODULES)
+
+
+def __getattr__(name):
+    if name not in _AGENT_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    agent_class = getattr(importlib.import_module(_AGENT_MODULES[name], __name__), name)
+    globals()[name] = agent_class
+    return agent_class
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
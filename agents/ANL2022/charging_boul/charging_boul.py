@@ -1,3 +1,4 @@
+from agents.template_agent.utils.agent_storage import AgentStorage
 from .extended_util_space import ExtendedUtilSpace
 from .utils.opponent_model import OpponentModel
 from decimal import Decimal
@@ -19,7 +20,6 @@ from geniusweb.profileconnection.ProfileConnectionFactory import ProfileConnecti
 from geniusweb.profileconnection.ProfileInterface import ProfileInterface
 from geniusweb.progress.Progress import Progress
 from geniusweb.references.Parameters import Parameters
-from json import dump, load
 from random import randint
 from statistics import mean
 from time import time as clock
@@ -36,7 +36,7 @@ class ChargingBoul(DefaultParty):
         self.domain: Domain = None
         self.e: float = 0.1
         self.extended_space: ExtendedUtilSpace = None
-        self.filepath: str = None
+        self.storage_key: str = None
         self.final_rounds: int = 90
         self.last_received_bid: Bid = None
         self.last_received_util: Decimal = None
@@ -52,6 +52,7 @@ class ChargingBoul(DefaultParty):
         self.received_bids: list = []
         self.received_utils: list = []
         self.settings: Settings = None
+        self.storage: AgentStorage = None
         self.storage_dir: str = None
         self.summary: dict = None
         self.util_space: LinearAdditive = None
@@ -75,6 +76,8 @@ class ChargingBoul(DefaultParty):
                 )
                 self.progress = self.settings.getProgress()
                 self.storage_dir = self.parameters.get("storage_dir")
+                if self.storage_dir is not None:
+                    self.storage = AgentStorage(self.storage_dir)
                 self.util_space = self.profile_int.getProfile()
                 self.domain = self.util_space.getDomain()
                 self.extended_space = ExtendedUtilSpace(self.util_space)
@@ -84,7 +87,7 @@ class ChargingBoul(DefaultParty):
                 actor = other_act.getActor()
                 if actor != self.me:
                     self.other = str(actor).rsplit("_", 1)[0]
-                    self.filepath = f"{self.storage_dir}/{self.other}.json"
+                    self.storage_key = f"{self.other}.json"
                 if isinstance(other_act, Offer):
                     # create opponent model if it was not yet initialised
                     if self.opponent_model is None:
@@ -129,9 +132,9 @@ class ChargingBoul(DefaultParty):
     ##################### private support funcs #########################
 
     def detect_strategy(self):
-        if self.filepath is not None:
-            with open(self.filepath, "w") as f:
-                self.summary = load(f)
+        if self.storage is not None and self.storage_key is not None:
+            self.summary = self.storage.read_json(self.storage_key)
+        if self.summary is not None:
             if self.summary["ubi"] >= 5:
                 self.opponent_strategy = "boulware"
                 self.e = 0.2 * 2**(5 - self.summary["ubi"])
@@ -215,12 +218,14 @@ class ChargingBoul(DefaultParty):
             self.profile_int = None
 
     def save_data(self):
+        if self.storage is None or self.storage_key is None:
+            return
         ubi, aui = self.summarize_opponent()
-        with open(self.filepath, "w") as f:
-            dump({
-                "ubi": ubi,
-                "aui": aui
-            }, f)
+        # sessions against the same opponent may run in parallel, so replace the file atomically
+        self.storage.write_json(self.storage_key, {
+            "ubi": ubi,
+            "aui": aui
+        })
 
     def summarize_opponent(self):
         # Detect how much the number of unique bids is increasing
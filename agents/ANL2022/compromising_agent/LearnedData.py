@@ -1,11 +1,34 @@
+import io
 import math
 from math import sqrt
 
+import numpy as np
+
 from .NegotiationData import NegotiationData
 
+# fixed schema of the binary learned data (one record per opponent), see `LearnedData.save`
+RECORD_DTYPE = np.dtype([
+    ("opponentName", "<U128"),
+    ("avgUtility", "<f8"),
+    ("numEncounters", "<i8"),
+    ("avgMaxUtilityOpponent", "<f8"),
+    ("stdUtility", "<f8"),
+    ("avgOpponentUtility", "<f8"),
+    ("opponentAlpha", "<f8"),
+    ("negoResultsSum", "<f8"),
+    ("negoResultsSumSq", "<f8"),
+    ("opponentUtilByTime", "<f8", (40,)),
+    ("opponentMaxReject", "<f8", (40,)),
+])
+
 
 class LearnedData:
     """This class hold the learned data of our agent.
+
+    The learned data is stored as a single fixed-size record (`RECORD_DTYPE`), so
+    loading it costs the same however often we met the opponent. The agreement
+    utilities of all encounters are only needed for the standard deviation, which
+    is kept up to date with running sums instead.
     """
 
     __tSplit: int = 40
@@ -28,26 +51,78 @@ class LearnedData:
 
         # our new data structures
         self.__stdUtility: float = 0.0
-        self.__negoResults: list = []
+        self.__negoResultsSum: float = 0.0
+        self.__negoResultsSumSq: float = 0.0
         self.__avgOpponentUtility: float = 0.0
         self.__opponentAlpha: float = 0.0
         self.__opponentUtilByTime: list = []
         self.__opponentMaxReject: list = [0.0] * self.__tSplit
 
     def encode(self, paramList: list):
-        """ This function get deserialize json
+        """ This function get deserialize json of older versions of the agent,
+        see `utils/migrate_learned_data.py`
         """
         self.__opponentName = paramList[0]
         self.__avgUtility = paramList[1]
         self.__numEncounters = paramList[2]
         self.__avgMaxUtilityOpponent = paramList[3]
         self.__stdUtility = paramList[4]
-        self.__negoResults = paramList[5]
+        self.__negoResultsSum = sum(paramList[5])
+        self.__negoResultsSumSq = sum(util * util for util in paramList[5])
         self.__avgOpponentUtility = paramList[6]
         self.__opponentAlpha = paramList[7]
         self.__opponentUtilByTime = paramList[8]
         self.__opponentMaxReject = paramList[9]
 
+    def save(self, storage, key: str):
+        """ Atomically writes the learned data record to a key of an AgentStorage.
+        The caller must hold the lock of the key (`storage.lock(key)`) from loading
+        the record to saving it, so that parallel sessions do not lose updates.
+        """
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["opponentName"] = self.__opponentName if self.__opponentName is not None else ""
+        record["avgUtility"] = self.__avgUtility
+        record["numEncounters"] = self.__numEncounters
+        record["avgMaxUtilityOpponent"] = self.__avgMaxUtilityOpponent
+        record["stdUtility"] = self.__stdUtility
+        record["avgOpponentUtility"] = self.__avgOpponentUtility
+        record["opponentAlpha"] = self.__opponentAlpha
+        record["negoResultsSum"] = self.__negoResultsSum
+        record["negoResultsSumSq"] = self.__negoResultsSumSq
+        if self.__opponentUtilByTime != []:
+            record["opponentUtilByTime"] = self.__opponentUtilByTime
+        record["opponentMaxReject"] = self.__opponentMaxReject
+
+        buffer = io.BytesIO()
+        np.save(buffer, record)
+        storage.write_bytes(key, buffer.getvalue())
+
+    @classmethod
+    def load(cls, storage, key: str):
+        """ Loads the learned data record from a key of an AgentStorage, or returns
+        None if there is none. Only the fixed-size record is read.
+        """
+        if not storage.exists(key):
+            return None
+
+        record = np.load(storage.path(key), mmap_mode="r")[0]
+        learnedData = cls()
+        # records of the first binary version have no opponent name
+        if "opponentName" in record.dtype.names and str(record["opponentName"]) != "":
+            learnedData.__opponentName = str(record["opponentName"])
+        learnedData.__avgUtility = float(record["avgUtility"])
+        learnedData.__numEncounters = int(record["numEncounters"])
+        learnedData.__avgMaxUtilityOpponent = float(record["avgMaxUtilityOpponent"])
+        learnedData.__stdUtility = float(record["stdUtility"])
+        learnedData.__avgOpponentUtility = float(record["avgOpponentUtility"])
+        learnedData.__opponentAlpha = float(record["opponentAlpha"])
+        learnedData.__negoResultsSum = float(record["negoResultsSum"])
+        learnedData.__negoResultsSumSq = float(record["negoResultsSumSq"])
+        learnedData.__opponentUtilByTime = record["opponentUtilByTime"].tolist() \
+            if learnedData.__numEncounters > 0 else []
+        learnedData.__opponentMaxReject = record["opponentMaxReject"].tolist()
+        return learnedData
+
     def update(self, negotiationData: NegotiationData):
         """ Update the learned data with a negotiation data of a previous negotiation
                session
@@ -62,12 +137,14 @@ class LearnedData:
                             / (self.__numEncounters + 1)
 
         # add utility to UtiList calculate std deviation of results
-        self.__negoResults.append(negotiationData.getAgreementUtil())
-        self.__stdUtility = 0.0
-
-        for util in self.__negoResults:
-            self.__stdUtility += pow(util - self.__avgUtility, 2)
-        self.__stdUtility = sqrt(self.__stdUtility / (self.__numEncounters + 1))
+        agreementUtil = negotiationData.getAgreementUtil()
+        self.__negoResultsSum += agreementUtil
+        self.__negoResultsSumSq += agreementUtil * agreementUtil
+
+        # sum((util - avg) ^ 2) over all results, expanded into the running sums
+        squaredDeviations = self.__negoResultsSumSq - 2 * self.__avgUtility * self.__negoResultsSum \
+            + (self.__numEncounters + 1) * pow(self.__avgUtility, 2)
+        self.__stdUtility = sqrt(max(squaredDeviations, 0.0) / (self.__numEncounters + 1))
 
         # Track the average value of the maximum that an opponent has offered us across
         # multiple negotiation sessions Double
@@ -1,8 +1,5 @@
-import json
 import math
-import os
 from decimal import Decimal
-from os.path import exists
 
 from geniusweb.inform.Agreements import Agreements
 from geniusweb.issuevalue.ValueSet import ValueSet
@@ -38,6 +35,8 @@ from geniusweb.references.Parameters import Parameters
 from numpy.compat import long 
 from tudelft_utilities_logging.ReportToLogger import ReportToLogger
 
+from agents.template_agent.utils.agent_storage import AgentStorage
+
 from .LearnedData import LearnedData
 from .NegotiationData import NegotiationData
 from .Pair import Pair
@@ -64,9 +63,10 @@ class CompromisingAgent(DefaultParty):
         self.domain: Domain = None
         self.learnedData: LearnedData = None
         self.negotiationData: NegotiationData = None
-        self.learnedDataPath: str = None
-        self.negotiationDataPath: str = None
+        self.learnedDataKey: str = None
+        self.negotiationDataKey: str = None
         self.storage_dir: str = None
+        self.storage: AgentStorage = None
 
         self.opponentName: str = None
 
@@ -153,27 +153,21 @@ class CompromisingAgent(DefaultParty):
         agreements: Agreements = data.getAgreements()
         self.processAgreements(agreements)
 
-        # Write the negotiation data that we collected to the path provided.
-        if not (self.negotiationDataPath == None or self.negotiationData == None):
-            try:
-                with open(self.negotiationDataPath, "w") as f:
-                    # w means overwritten
-                    json.dump(self.negotiationData.__dict__, default=lambda o: o.__dict__, indent=5, fp=f)
-
-
-            except:
-                self.logger.log(logging.ERROR, "Failed to write negotiation data to disk")
-
-        # Write the learned data to the path provided.
-        if not (self.learnedDataPath == None or self.learnedData == None):
+        # Merge the negotiation data that we collected into the learned data. Sessions against the
+        # same opponent may run in parallel, so the learned data is read, updated and written while
+        # holding its lock, and no session loses the update of another.
+        if not (self.storage == None or self.learnedDataKey == None or self.negotiationData == None):
             try:
-                with open(self.learnedDataPath, "w") as f:
-                    # w means overwritten
-                    json.dump(self.learnedData.__dict__, default=lambda o: o.__dict__, indent=9, fp=f)
-
+                with self.storage.lock(self.learnedDataKey):
+                    learnedData = self.readLearnedData()
+                    learnedData = learnedData if learnedData is not None else LearnedData()
+                    learnedData.update(self.negotiationData)
+                    learnedData.save(self.storage, self.learnedDataKey)
+                    # the negotiation data left by an older version of the agent is merged now
+                    self.storage.remove(self.negotiationDataKey)
 
             except:
-                self.logger.log(logging.ERROR, "Failed to learned data to disk")
+                self.logger.log(logging.ERROR, "Failed to write learned data to disk")
 
         self.logger.log(logging.INFO, "party is terminating:")
         super().terminate()
@@ -190,12 +184,12 @@ class CompromisingAgent(DefaultParty):
                 # The part behind the last _ is always changing, so we must cut it off.
                 self.opponentName = str(actor).rsplit("_", 1)[0]
 
-                # path depend on opponent name
-                self.negotiationDataPath = self.getPath("negotiationData", self.opponentName)
-                self.learnedDataPath = self.getPath("learnedData", self.opponentName)
+                # storage keys depend on opponent name
+                self.negotiationDataKey = self.getKey("negotiationData", self.opponentName)
+                self.learnedDataKey = self.getKey("learnedData", self.opponentName, ".npy")
 
-                # update and load learnedData
-                self.updateAndLoadLearnedData()
+                # load learnedData
+                self.loadLearnedData()
 
                 # Add name of the opponent to the negotiation data
                 self.negotiationData.setOpponentName(self.opponentName)
@@ -240,6 +234,8 @@ class CompromisingAgent(DefaultParty):
         self.parameters = settings.getParameters()
 
         self.storage_dir = self.parameters.get("storage_dir")
+        if self.storage_dir is not None:
+            self.storage = AgentStorage(self.storage_dir)
 
         # We are in the negotiation step.
         # Create a new NegotiationData object to store information on this negotiation.
@@ -535,35 +531,44 @@ class CompromisingAgent(DefaultParty):
             print("Warning: Value wasn't found")
         return v_str
 
-    def getPath(self, dataType: str, opponentName: str):
-        return os.path.join(self.storage_dir, dataType + "_" + opponentName + ".json")
+    def getKey(self, dataType: str, opponentName: str, extension: str = ".json"):
+        return dataType + "_" + opponentName + extension
 
-    def updateAndLoadLearnedData(self):
-        # we didn't meet this opponent before
-        if exists(self.negotiationDataPath):
-            try:
-                # Load the negotiation data object of a previous negotiation
-                with open(self.negotiationDataPath, "r") as f:
-                    negotiationData: NegotiationData = NegotiationData()
-                    negotiationData.encode(list(json.load(f).values()))
+    def readLearnedData(self):
+        """ Learned data of all previous negotiations against the opponent, or None if we
+        didn't meet this opponent before. The negotiation data of a session is merged into
+        the learned data when the session finishes.
+        """
+        learnedData: LearnedData = None
 
-            except:
-                self.logger.log(logging.ERROR, "Negotiation data does not exist")
+        # learned data of older versions of the agent is stored as json, see utils/migrate_learned_data.py
+        jsonLearnedDataKey = self.getKey("learnedData", self.opponentName)
+        if self.storage.exists(self.learnedDataKey):
+            learnedData = LearnedData.load(self.storage, self.learnedDataKey)
+        elif self.storage.exists(jsonLearnedDataKey):
+            learnedData = LearnedData()
+            learnedData.encode(list(self.storage.read_json(jsonLearnedDataKey).values()))
 
-            if exists(self.learnedDataPath):
-                try:
-                    # Load the negotiation data object of a previous negotiation
-                    with open(self.learnedDataPath, "r") as f:
-                        self.learnedData = LearnedData()
-                        self.learnedData.encode(list(json.load(f).values()))
+        # older versions of the agent merged the negotiation data of a session at the start of the next one
+        if self.storage.exists(self.negotiationDataKey):
+            negotiationData: NegotiationData = NegotiationData()
+            negotiationData.encode(list(self.storage.read_json(self.negotiationDataKey).values()))
+            learnedData = learnedData if learnedData is not None else LearnedData()
+            learnedData.update(negotiationData)
 
-                except:
-                    self.logger.log(logging.ERROR, "learned data does not exist")
+        return learnedData
 
-            else:
-                self.learnedData = LearnedData()
+    def loadLearnedData(self):
+        if self.storage is None:
+            return
+
+        try:
+            self.learnedData = self.readLearnedData()
+
+        except:
+            self.logger.log(logging.ERROR, "Failed to load learned data")
 
-            # Process the negotiation data in our learned Data
-            self.learnedData.update(negotiationData)
+        # learnedData stays None if we didn't meet this opponent before
+        if self.learnedData is not None:
             self.avgUtil = self.learnedData.getAvgUtility()
             self.stdUtil = self.learnedData.getStdUtility()
@@ -1,5 +1,4 @@
 import logging
-from random import randint
 from time import time
 from typing import cast
 
@@ -8,7 +7,6 @@ from geniusweb.actions.Accept import Accept
 from geniusweb.actions.Action import Action
 from geniusweb.actions.Offer import Offer
 from geniusweb.actions.PartyId import PartyId
-from geniusweb.bidspace.AllBidsList import AllBidsList
 from geniusweb.inform.ActionDone import ActionDone
 from geniusweb.inform.Finished import Finished
 from geniusweb.inform.Inform import Inform
@@ -28,6 +26,7 @@ from geniusweb.progress.ProgressTime import ProgressTime
 from geniusweb.references.Parameters import Parameters
 from tudelft_utilities_logging.ReportToLogger import ReportToLogger
 
+from agents.template_agent.utils.bid_space_index import BidSpaceIndex
 from agents.template_agent.utils.opponent_model import OpponentModel
 
 # our imports
@@ -57,6 +56,7 @@ class GEAAgent(DefaultParty):
 
         self.last_received_bid: Bid = None
         self.opponent_model: OpponentModel = None
+        self.bid_space: BidSpaceIndex = None
         self.logger.log(logging.INFO, "party is initialized")
 
         # our parameters
@@ -69,6 +69,9 @@ class GEAAgent(DefaultParty):
         # decision tree and weights
         self.decision_model = None
         self.tree_depth = 20
+        # the tree is refitted when it mispredicts a new sample, and otherwise every `refit_every` samples
+        self.refit_every = 10
+        self.samples_since_fit = 0
         self.orig_opponent_agree_weight = 0.15
         self.opponent_agree_weight = self.orig_opponent_agree_weight
         self.accept_threshold = 0.85  # for heuristic function, not utility.
@@ -117,6 +120,8 @@ class GEAAgent(DefaultParty):
             )
             self.profile = profile_connection.getProfile()
             self.domain = self.profile.getDomain()
+            # encode all possible bids once, so that candidates can be scored in bulk
+            self.bid_space = BidSpaceIndex(self.profile)
             profile_connection.close()
 
             # our code: init issue dictionary
@@ -263,21 +268,11 @@ class GEAAgent(DefaultParty):
         return any(conditions)
 
     def find_bid(self) -> Bid:
-        # compose a list of all possible bids
-        domain = self.profile.getDomain()
-        all_bids = AllBidsList(domain)
-
-        best_bid_score = 0.0
-        best_bid = None
-
-        # take 500 attempts to find a bid according to a heuristic score
-        for _ in range(500):
-            bid = all_bids.get(randint(0, all_bids.size() - 1))
-            bid_score = self.score_bid(bid)
-            if bid_score > best_bid_score:
-                best_bid_score, best_bid = bid_score, bid
+        # take 500 random bids and pick the one with the best heuristic score
+        candidates = np.random.randint(0, len(self.bid_space), 500)
+        scores = self.score_bids(candidates)
 
-        return best_bid
+        return self.bid_space[int(candidates[np.argmax(scores)])]
 
     def score_bid(self, bid: Bid, alpha: float = 0.95, eps: float = 0.1) -> float:
         ''' Calculate heuristic score for a bid '''
@@ -293,47 +288,59 @@ class GEAAgent(DefaultParty):
 
         return score
 
+    def score_bids(self, candidates: np.ndarray, alpha: float = 0.95, eps: float = 0.1) -> np.ndarray:
+        ''' Calculate the heuristic score of `score_bid` for many bids at once, given as
+        positions in `self.bid_space` '''
+        progress = self.progress.get(time() * 1000)
+
+        our_utilities = self.bid_space.utilities[candidates]
+
+        time_pressure = 1.0 - progress ** (1 / eps)
+        scores = alpha * time_pressure * our_utilities
+
+        # predict the opponent reaction to all candidates at once
+        if self.decision_model is not None:
+            opponent_scores = self.decision_model.predict(self.encode_bids(self.bid_space.bids[candidates]))
+            scores += opponent_scores.astype(float) * self.opponent_agree_weight
+
+        return scores
+
+    def encode_bids(self, rows: np.ndarray) -> np.ndarray:
+        ''' one-hot encoding of bids, given as rows of value indices of `self.bid_space` '''
+        return np.hstack(
+            [self.issue_encoder[issue][rows[:, j]] for j, issue in enumerate(self.bid_space.issues)]
+        )
+
 
     def tree_predict(self, bid: Bid) -> float:
         ''' returns acceptance estimation for the other agent '''
-        bid_data = []
-        bid_issue_values = bid.getIssueValues()
-        domain_issues = list(bid_issue_values.keys())
-        domain_issues.sort()
-        for issue in domain_issues:
-            # encode categorical data
-            issue_encoded = label_binarize([str(bid_issue_values[issue])], classes=self.all_issue_values[issue])
-            # concat current category to X
-            bid_data.extend(issue_encoded.flatten().tolist())
-
         # if the tree is trained, we can use it to predict opponent reaction
         if self.decision_model is not None:
-            tree_prediction = float(self.decision_model.predict(np.array(bid_data).reshape(1, -1)))
+            bid_data = self.encode_bids(self.bid_space.encode(bid).reshape(1, -1))
+            tree_prediction = float(self.decision_model.predict(bid_data)[0])
             return tree_prediction
 
         return 0  # no knowledge
 
     def append_data_and_train_tree(self, bid: Bid, opponent_accept: int) -> None:
         ''' appends new bid to negotiation history and retrain model '''
-        bid_data = []
-        bid_issue_values = bid.getIssueValues()
-        domain_issues = list(bid_issue_values.keys())
-        domain_issues.sort()
-        for issue in domain_issues:
-            # encode categorical data
-            issue_encoded = label_binarize([str(bid_issue_values[issue])], classes=self.all_issue_values[issue])
-            # concat current category to X
-            bid_data.extend(issue_encoded.flatten().tolist())
+        bid_data = self.encode_bids(self.bid_space.encode(bid).reshape(1, -1))
 
         self.data_len += 1
-        self.dataX.append(bid_data)
+        self.dataX.append(bid_data[0])
         self.dataY.append(opponent_accept)
+        self.samples_since_fit += 1
 
         # train tree if at least two samples were collected
 
         if self.data_len > 2:
-            self.decision_model = tree.DecisionTreeClassifier(criterion="entropy", max_depth=self.tree_depth)
-            self.decision_model.fit(self.dataX, self.dataY)
+            # keep the cached tree while it predicts the new samples right, refitting
+            # on the full history is the expensive part of a turn
+            drift = self.decision_model is None or self.decision_model.predict(bid_data)[0] != opponent_accept
+            if drift or self.samples_since_fit >= self.refit_every:
+                self.decision_model = tree.DecisionTreeClassifier(criterion="entropy", max_depth=self.tree_depth)
+                self.decision_model.fit(np.array(self.dataX), self.dataY)
+                self.samples_since_fit = 0
 
     def init_bid_values(self):
         ''' must be called to binarize labels '''
@@ -344,3 +351,11 @@ class GEAAgent(DefaultParty):
             self.all_issue_values[issue] = []
             for value in domain.getValues(issue):
                 self.all_issue_values[issue].append(str(value))
+
+        # encoding of every value of an issue (one row per value, in the value order
+        # of the bid space index), so bids are encoded by lookup instead of label_binarize
+        self.issue_encoder = {}
+        for issue, values in zip(self.bid_space.issues, self.bid_space.values):
+            self.issue_encoder[issue] = label_binarize(
+                [str(value) for value in values], classes=self.all_issue_values[issue]
+            )
@@ -1,11 +1,77 @@
+from collections import deque
+from math import sqrt
+
 import numpy as np
-from sklearn.linear_model import LinearRegression
 
 """
 Key assumptions:
 1. turns_left will only be called during our agent's "turn"
 2. times will be added to their respective lists using the progress function
 """
+class RunningLinearRegression:
+    """
+    Least squares fit of y = coef * x + intercept over the last frame_length points.
+    The sums of x, y, x*x, x*y and y*y over the points in a ring buffer are updated
+    when a point is added or drops out of the frame, so a fit costs O(1). The sums
+    are recomputed from the buffer every frame_length points to avoid that rounding
+    errors accumulate.
+    """
+
+    def __init__(self, frame_length: int):
+        self.frame_length = frame_length
+        self.points = deque(maxlen=frame_length)
+        self.updates_since_recompute = 0
+        self._recompute()
+
+    def add(self, x: float, y: float):
+        if len(self.points) == self.frame_length:
+            old_x, old_y = self.points[0]
+            self.sum_x -= old_x
+            self.sum_y -= old_y
+            self.sum_xx -= old_x * old_x
+            self.sum_xy -= old_x * old_y
+            self.sum_yy -= old_y * old_y
+        self.points.append((x, y))
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xx += x * x
+        self.sum_xy += x * y
+        self.sum_yy += y * y
+
+        self.updates_since_recompute += 1
+        if self.updates_since_recompute >= self.frame_length:
+            self._recompute()
+
+    def _recompute(self):
+        self.sum_x = self.sum_y = self.sum_xx = self.sum_xy = self.sum_yy = 0.0
+        for x, y in self.points:
+            self.sum_x += x
+            self.sum_y += y
+            self.sum_xx += x * x
+            self.sum_xy += x * y
+            self.sum_yy += y * y
+        self.updates_since_recompute = 0
+
+    def fit(self):
+        """
+        Returns coef, intercept and the standard deviation of the residuals,
+        like LinearRegression().fit(X, y) followed by np.std(y_pred - y)
+        """
+        n = len(self.points)
+        mean_x = self.sum_x / n
+        mean_y = self.sum_y / n
+        # sums of squares and products around the means
+        ss_xx = self.sum_xx - self.sum_x * mean_x
+        ss_xy = self.sum_xy - self.sum_x * mean_y
+        ss_yy = self.sum_yy - self.sum_y * mean_y
+
+        coef = ss_xy / ss_xx if ss_xx > 0 else 0.0
+        intercept = mean_y - coef * mean_x
+        # the residuals of a least squares fit have mean 0
+        stdev = sqrt(max(ss_yy - coef * ss_xy, 0.0) / n)
+        return coef, intercept, stdev
+
+
 class TimeEstimator:
 
     def __init__(self):
@@ -17,6 +83,8 @@ class TimeEstimator:
         self.self_diff = []
         self.FRAME_LENGTHS = [10000, 100]
         self.UPDATE_PERIODS = [1, 1]
+        self.regressions = [RunningLinearRegression(frame_length) for frame_length in self.FRAME_LENGTHS]
+        # (coef, intercept) of the latest fit per frame length
         self.models = [None for _ in range(len(self.FRAME_LENGTHS))]
         self.stdevs = [None for _ in range(len(self.FRAME_LENGTHS))]
         self.self_times_adj = []
@@ -24,6 +92,9 @@ class TimeEstimator:
         
         self.round_count = 0
         self.outlier_count = 0
+        # running mean and sum of squared deviations (Welford) of self_times for the outlier detection
+        self.self_times_mean = 0.0
+        self.self_times_m2 = 0.0
         self.time_factor = 1.0
 
     def update_time_factor(self, time_factor: float):
@@ -43,8 +114,16 @@ class TimeEstimator:
         self.round_count += 1
         self.self_times.append(time)
         self.rounds.append(self.round_count)
-        if self.round_count > 5 and time > np.mean(self.self_times) + 3 * np.std(self.self_times):
-            self.outlier_count += 1
+        delta = time - self.self_times_mean
+        self.self_times_mean += delta / len(self.self_times)
+        self.self_times_m2 += delta * (time - self.self_times_mean)
+        for regression in self.regressions:
+            regression.add(self.round_count, time)
+
+        if self.round_count > 5:
+            std = sqrt(self.self_times_m2 / len(self.self_times))
+            if time > self.self_times_mean + 3 * std:
+                self.outlier_count += 1
         # self.outliers.append(self.outlier_count)
         #self.roundsquare.append(self.round_count * self.round_count)
 
@@ -54,28 +133,12 @@ class TimeEstimator:
         self.opp_times.append(value)
         self.self_diff.append(value - self.self_times[-1])
 
-    def _generate_model(self, frame_length):
-        y_list = self.self_times if len(self.self_times) < frame_length else self.self_times[-frame_length:]
-        x1_list = self.rounds if len(self.rounds) < frame_length else self.rounds[-frame_length:]
-        # x2_list = self.roundsquare if len(self.roundsquare) < frame_length else self.rounds[-frame_length:]
-        y = np.array(y_list)
-        x1 = np.array(x1_list)
-        # x2 = np.array(x2_list)
-        # X = np.stack([x1, x2]).transpose((1,0))
-        X = np.array([x1]).transpose((1,0))
-        model1 = LinearRegression().fit(X, y)
-        # model2 = LinearRegression().fit(X2, y)
-        y_pred = model1.predict(X)
-        res = y_pred - y
-        stdev = np.std(res)
-        return model1, stdev
-
     def update_model(self):
         issue_count = len(self.self_times)
         for i, (frame_length, update_period) in enumerate(zip(self.FRAME_LENGTHS, self.UPDATE_PERIODS)):
             if issue_count % update_period == 0 or i < 5:
-                model, stdev = self._generate_model(frame_length)
-                self.models[i] = model
+                coef, intercept, stdev = self.regressions[i].fit()
+                self.models[i] = (coef, intercept)
                 self.stdevs[i] = stdev
 
     def turns_left(self, time):
@@ -84,13 +147,10 @@ class TimeEstimator:
         """
         if len(self.self_times) <= 1:
             return 2000
-        p_list = [np.append(model.coef_, model.intercept_ - 1.0) for model in self.models]
-        # final_turn_counts = np.array([np.max(np.roots(p)) / (1.0 + stdev) for p, stdev in zip(p_list, self.stdevs)])
-        final_turn_counts = np.array([np.max(np.roots(p)) / (1.0 + stdev) * self.time_factor for p, stdev in zip(p_list, self.stdevs)])
+        # the root of coef * x + intercept - t, i.e. the turn at which time t is reached
+        final_turn_counts = np.array([-(intercept - 1.0) / coef / (1.0 + stdev) * self.time_factor for (coef, intercept), stdev in zip(self.models, self.stdevs)])
 
-        p_list = [np.append(model.coef_, model.intercept_ - time) for model in self.models]
-        # time_turn_counts = np.array([np.max(np.roots(p)) / (1.0 + stdev) for p, stdev in zip(p_list, self.stdevs)])
-        time_turn_counts = np.array([np.max(np.roots(p)) / (1.0 + stdev) * self.time_factor for p, stdev in zip(p_list, self.stdevs)])
+        time_turn_counts = np.array([-(intercept - time) / coef / (1.0 + stdev) * self.time_factor for (coef, intercept), stdev in zip(self.models, self.stdevs)])
         
         return int(np.min(final_turn_counts - time_turn_counts))
 
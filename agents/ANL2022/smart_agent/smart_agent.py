@@ -4,11 +4,11 @@ import math
 import os.path
 import random
 from decimal import Decimal
-from random import randint
 from time import time
 from typing import cast
 from typing import final
 
+import numpy as np
 import geniusweb.actions.LearningDone
 from geniusweb.actions.Accept import Accept
 from geniusweb.actions.Action import Action
@@ -41,6 +41,7 @@ from geniusweb.progress.ProgressTime import ProgressTime
 from geniusweb.references.Parameters import Parameters
 from tudelft_utilities_logging.ReportToLogger import ReportToLogger
 
+from agents.template_agent.utils.bid_space_index import BidSpaceIndex
 from agents.template_agent.utils.opponent_model import OpponentModel
 
 
@@ -98,6 +99,7 @@ class SmartAgent(DefaultParty):
         self.opThreshold = None
         self.last_received_bid: Bid = None
         self.opponent_model: OpponentModel = None
+        self.bid_space: BidSpaceIndex = None
         self.logger.log(logging.INFO, "party is initialized")
 
     def notifyChange(self, data: Inform):
@@ -132,6 +134,8 @@ class SmartAgent(DefaultParty):
                 )
                 self.profile = profile_connection.getProfile()
                 self.domain = self.profile.getDomain()
+                # encode all possible bids once, so that candidates can be scored in bulk
+                self.bid_space = BidSpaceIndex(self.profile)
 
                 if str(self.settings.getProtocol().getURI()) == "Learn":
                     self.learn()
@@ -437,21 +441,11 @@ class SmartAgent(DefaultParty):
         return self.utilitySpace.getUtility(bid) >= self.utilThreshold
 
     def find_bid(self) -> Bid:
-        # compose a list of all possible bids
-        domain = self.profile.getDomain()
-        all_bids = AllBidsList(domain)
+        # take 500 random bids and pick the one with the best heuristic score
+        candidates = np.random.randint(0, len(self.bid_space), 500)
+        scores = self.score_bids(candidates)
 
-        best_bid_score = 0.0
-        best_bid = None
-
-        # take 500 attempts to find a bid according to a heuristic score
-        for _ in range(500):
-            bid = all_bids.get(randint(0, all_bids.size() - 1))
-            bid_score = self.score_bid(bid)
-            if bid_score > best_bid_score:
-                best_bid_score, best_bid = bid_score, bid
-
-        return best_bid
+        return self.bid_space[int(candidates[np.argmax(scores)])]
 
     def score_bid(self, bid: Bid, alpha: float = 0.95, eps: float = 0.1) -> float:
         """Calculate heuristic score for a bid
@@ -480,6 +474,34 @@ class SmartAgent(DefaultParty):
 
         return score
 
+    def score_bids(self, candidates: np.ndarray, alpha: float = 0.95, eps: float = 0.1) -> np.ndarray:
+        """Calculate the heuristic score of `score_bid` for many bids at once
+
+        Args:
+            candidates (np.ndarray): positions of the bids in `self.bid_space`
+            alpha (float, optional): Trade-off factor between self interested and
+                altruistic behaviour. Defaults to 0.95.
+            eps (float, optional): Time pressure factor, balances between conceding
+                and Boulware behaviour over time. Defaults to 0.1.
+
+        Returns:
+            np.ndarray: score of every candidate
+        """
+        progress = self.progress.get(time() * 1000)
+
+        our_utilities = self.bid_space.utilities[candidates]
+
+        time_pressure = 1.0 - progress ** (1 / eps)
+        scores = alpha * time_pressure * our_utilities
+
+        if self.opponent_model is not None:
+            opponent_utilities = self.opponent_model.get_predicted_utilities(
+                self.bid_space.issues, self.bid_space.bids[candidates]
+            )
+            scores += (1.0 - alpha * time_pressure) * opponent_utilities
+
+        return scores
+
     def learn(self):
         # not called...
         return "ok"
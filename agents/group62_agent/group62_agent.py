@@ -1,4 +1,6 @@
 import logging
+import os
+import tempfile
 from time import time
 from typing import cast
 
@@ -203,9 +205,16 @@ class Group62Agent(DefaultParty):
         for learning capabilities. Note that no extensive calculations can be done within this method.
         Taking too much time might result in your agent being killed, so use it for storage only.
         """
+        if self.storage_dir is None:
+            return
+
         data = "Data for learning (see README.md)"
-        with open(f"{self.storage_dir}/data.md", "w") as f:
+        # write a temporary file that replaces data.md, so that parallel sessions
+        # of this agent never leave a partially written file behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.storage_dir, prefix=".data.md.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
             f.write(data)
+        os.replace(tmp_path, f"{self.storage_dir}/data.md")
 
     def accept_condition(self, received_bid: Bid, bid: Bid) -> bool:
         if bid is None:
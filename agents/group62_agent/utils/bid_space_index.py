@@ -0,0 +1,116 @@
+from typing import List, Tuple
+
+import numpy as np
+from geniusweb.issuevalue.Bid import Bid
+from geniusweb.issuevalue.DiscreteValueSet import DiscreteValueSet
+from geniusweb.issuevalue.Value import Value
+from geniusweb.profile.utilityspace.LinearAdditiveUtilitySpace import (
+    LinearAdditiveUtilitySpace,
+)
+
+
+class BidSpaceIndex:
+    """
+    Compact index over all bids of a domain, sorted on utility (descending).
+
+    Bids are stored as a matrix of value indices (one row per bid, one column per
+    issue) next to an array of float utilities. Bid objects are only created when
+    a bid is asked for, so agents can search the bid space without holding
+    thousands of Bid objects and Decimal utilities in memory.
+    """
+
+    def __init__(self, profile: LinearAdditiveUtilitySpace):
+        domain = profile.getDomain()
+
+        self.issues: List[str] = sorted(domain.getIssues())
+        self.values: List[List[Value]] = []
+        for issue in self.issues:
+            value_set = domain.getValues(issue)
+            if not isinstance(value_set, DiscreteValueSet):
+                raise TypeError("The bid space index only supports issues with discrete values")
+            self.values.append([value_set.get(i) for i in range(value_set.size())])
+        self._value_index = [
+            {value: i for i, value in enumerate(values)} for values in self.values
+        ]
+
+        # encode all bids as value indices
+        sizes = [len(values) for values in self.values]
+        dtype = np.uint8 if max(sizes) <= 256 else np.uint16
+        bids = np.indices(sizes, dtype=dtype).reshape(len(sizes), -1).T
+
+        # utility of every bid, summed over the weighted value utilities per issue
+        utilities = np.zeros(len(bids))
+        for j, issue in enumerate(self.issues):
+            weight = profile.getWeight(issue)
+            value_utilities = profile.getUtilities()[issue]
+            weighted_values = np.array(
+                [float(weight * value_utilities.getUtility(v)) for v in self.values[j]]
+            )
+            utilities += weighted_values[bids[:, j]]
+
+        # sort descending on utility, keep the domain order for equal utilities
+        order = np.argsort(-utilities, kind="stable")
+        self.bids: np.ndarray = bids[order]
+        self.utilities: np.ndarray = utilities[order]
+        self._negative_utilities = -self.utilities
+
+    def __len__(self) -> int:
+        return len(self.utilities)
+
+    def __getitem__(self, index):
+        # a slice or an array of positions gives a list of bids
+        if isinstance(index, (slice, list, np.ndarray)):
+            return [self.decode(row) for row in self.bids[index]]
+        return self.decode(self.bids[index])
+
+    def get_utility(self, index: int) -> float:
+        """Utility of the bid at a position in the index"""
+        return float(self.utilities[index])
+
+    def decode(self, row: np.ndarray) -> Bid:
+        """Turns a row of value indices into a Bid"""
+        return Bid(
+            {issue: self.values[j][row[j]] for j, issue in enumerate(self.issues)}
+        )
+
+    def encode(self, bid: Bid) -> np.ndarray:
+        """Turns a Bid into a row of value indices"""
+        return np.array(
+            [
+                self._value_index[j][bid.getValue(issue)]
+                for j, issue in enumerate(self.issues)
+            ],
+            dtype=self.bids.dtype,
+        )
+
+    def range_indices(self, low: float, high: float, inclusive: bool = True) -> Tuple[int, int]:
+        """Positions [start, stop) of the bids with low <= utility <= high, in O(log n)
+
+        Args:
+            low (float): lower bound of the utility
+            high (float): upper bound of the utility
+            inclusive (bool, optional): whether bids with a utility equal to one of
+                the bounds are included. Defaults to True.
+
+        Returns:
+            Tuple[int, int]: start and stop position in the index
+        """
+        start_side, stop_side = ("left", "right") if inclusive else ("right", "left")
+        start = int(np.searchsorted(self._negative_utilities, -high, side=start_side))
+        stop = int(np.searchsorted(self._negative_utilities, -low, side=stop_side))
+        return start, max(start, stop)
+
+    def bids_in_range(self, low: float, high: float, limit: int = None) -> List[Bid]:
+        """Bids with low <= utility <= high, best first, optionally at most `limit` bids"""
+        start, stop = self.range_indices(low, high)
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return self[start:stop]
+
+    def count_at_least(self, utility: float) -> int:
+        """Number of bids with a utility of at least `utility`"""
+        return int(np.searchsorted(self._negative_utilities, -utility, side="right"))
+
+    def top_k(self, k: int) -> List[Bid]:
+        """The k bids with the highest utility"""
+        return self[:k]
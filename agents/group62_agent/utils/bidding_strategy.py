@@ -1,7 +1,10 @@
-from geniusweb.bidspace.AllBidsList import AllBidsList
 from geniusweb.issuevalue import Bid
 from random import randint
 
+import numpy as np
+
+from .bid_space_index import BidSpaceIndex
+
 # Makes concession of 0.05 if stuck
 ISO_TOLERANCE = 0.05
 # Starting reservation value
@@ -21,34 +24,23 @@ class BiddingStrategy:
         self.reservation_value = params.get('reservation_value', RESERVATION_VALUE) if params else RESERVATION_VALUE
         self.conceding_speed = params.get('conceding_speed', CONCEDING_SPEED) if params else CONCEDING_SPEED
 
-        self._sorted_bids = self._sort_bids(AllBidsList(self._domain))
+        # All bids sorted descending on utility, supports O(log n) lookups of utility intervals
+        self._bid_space = BidSpaceIndex(self._profile)
         self._issues = domain.getIssues()
 
     # Return a random bid
     def _get_random_bid(self):
-        bids = AllBidsList(self._domain)
-        return bids.get(randint(0, bids.size() - 1))
+        return self._bid_space[randint(0, len(self._bid_space) - 1)]
 
     # Return the first n bids with iso-level of own utility function that is closer to the current opponent’s bid
     # If the number of bids to be returned is not provided, return the first 7 ones
     def _iso_curve_bids(self, n=7):
-        bids = []
-        i = 0
-        for bid in self._sorted_bids:
-            if self.reservation_value + self._iso_tolerance > bid['utility'] > self.reservation_value - self._iso_tolerance:
-                bids.append(bid['bid'])
-                i += 1
-            if i == n:
-                break
-        return bids
-
-    # Sort bids descending on utility
-    def _sort_bids(self, bids):
-        sorted_bids = []
-        for each_bid in bids:
-            bid = {"bid": each_bid, "utility": self._profile.getUtility(each_bid)}
-            sorted_bids.append(bid)
-        return sorted(sorted_bids, key=lambda x: x['utility'], reverse=True)
+        start, stop = self._bid_space.range_indices(
+            self.reservation_value - self._iso_tolerance,
+            self.reservation_value + self._iso_tolerance,
+            inclusive=False,
+        )
+        return self._bid_space[start:min(stop, start + n)]
 
     # Decrease the agent's accepted utility if no progress is being made
     # The decrease starts after the agent has offered 5 bids, and no acceptance was reached
@@ -89,12 +81,8 @@ class BiddingStrategy:
 
         # If both the agent and the opponent have generated bids,
         # Choose the bid with the maximum utility for the opponent (Trade-off/T4T hybrid) from the ISO curve bids
-        max_util = 0
-        best_bid = bids[0]
-        for bid in bids:
-            opponent_util = self._opponent_model.predict_utility(bid)
-            if opponent_util > max_util:
-                max_util = opponent_util
-                best_bid = bid
+        # (the first one on ties, or the first bid if no bid has a positive predicted utility)
+        opponent_utils = self._opponent_model.predict_utilities(bids)
+        best_bid = bids[int(np.argmax(opponent_utils))]
 
         return best_bid
@@ -12,57 +12,60 @@ class OpponentModel:
     def __init__(self, domain: Domain, params=None):
         
         self._domain = domain # we do not use the offers, we just need the frequencies
-        self._freqs = {} # stores frequencies of offers made by the opponent
+        self._issues = sorted(domain.getIssues())
 
         # controls effect of time in decay over time - can be modified to improve performance
         self._exp = params.get('decay_exp', DECAY_EXP) if params else DECAY_EXP
         self._decay = params.get('decay', True) if params else True
 
-        for i in self._domain.getIssues():
-            self._freqs[i] = {}
+        # index of every value within its issue, frequencies are stored in one array (issues x values)
+        self._value_index = {}
+        for i in self._issues:
+            values = self._domain.getValues(i)
+            self._value_index[i] = {values.get(k): k for k in range(values.size())}
+        max_values = max(len(v) for v in self._value_index.values())
+
+        self._freqs = np.zeros((len(self._issues), max_values)) # stores frequencies of offers made by the opponent
+        # running maximum frequency per issue and over all issues, kept up to date in update()
+        self._max_freqs = np.zeros(len(self._issues))
+        self._highest_freq = 0.0
 
     def update(self, bid: Bid, progress):
-        issues = self._domain.getIssues()
-        for i in issues:
-            val = bid.getValue(i)
-            if val not in self._freqs[i]:
-                self._freqs[i][val] = 0
-            if self._decay:
-                t = progress.get(time() * 1000)
-                inc = 1 * ((1 - t) ** self._exp)
-                self._freqs[i][val] += inc
-            else:
-                self._freqs[i][val] + 1
+        if self._decay:
+            t = progress.get(time() * 1000)
+            inc = 1 * ((1 - t) ** self._exp)
+        else:
+            inc = 1
+
+        for j, i in enumerate(self._issues):
+            k = self._value_index[i][bid.getValue(i)]
+            self._freqs[j, k] += inc
+            # frequencies only increase, so the maxima can be updated incrementally
+            if self._freqs[j, k] > self._max_freqs[j]:
+                self._max_freqs[j] = self._freqs[j, k]
+                if self._max_freqs[j] > self._highest_freq:
+                    self._highest_freq = self._max_freqs[j]
+
     def predict_utility(self, bid: Bid):
-        max_frequencies = {}
-        # get utility weights for each issue, with highest-frequency of most common bid values
-        for i in self._domain.getIssues():
-            max_frequencies[i] = 0
-            # check for max
-            for val in self._freqs[i]:
-                if max_frequencies[i] < self._freqs[i][val]:
-                    max_frequencies[i] = self._freqs[i][val]
+        # issue weight (max frequency of the issue / highest frequency) times normalised value
+        # frequency (frequency / max frequency of the issue) is frequency / highest frequency
+        if self._highest_freq == 0:
+            return 0.0
+
+        freqs_sum = 0.0
+        for j, i in enumerate(self._issues):
+            freqs_sum += self._freqs[j, self._value_index[i][bid.getValue(i)]]
 
-        highest_freq = -np.inf
-        for i in self._domain.getIssues():
-            if max_frequencies[i] > highest_freq:
-                highest_freq = max_frequencies[i]
+        return freqs_sum / self._highest_freq / len(self._issues)
 
-        util_weights = {}
-        # normalize weights
-        for i in self._domain.getIssues():
-            # avoid div by 0
-            if highest_freq == 0:
-                util_weights[i] = 0
-            else:
-                util_weights[i] = max_frequencies[i] / highest_freq
+    def predict_utilities(self, bids: list) -> np.ndarray:
+        """Predicts the utility of many bids at once, see `predict_utility`"""
+        if len(bids) == 0 or self._highest_freq == 0:
+            return np.zeros(len(bids))
 
-        # frequency normalization and multiply with weights:
-        normalised_freqs = []
-        for i in self._domain.getIssues():
-            val = bid.getValue(i)
-            if val in self._freqs[i]:
-                normalised_freqs.append((self._freqs[i][val] / max_frequencies[i]) * util_weights[i])
+        encoded = np.array(
+            [[self._value_index[i][bid.getValue(i)] for i in self._issues] for bid in bids]
+        )
+        freqs = self._freqs[np.arange(len(self._issues)), encoded]
 
-        utility_pred = np.sum(normalised_freqs) / len(self._domain.getIssues())
-        return utility_pred
+        return freqs.sum(axis=1) / self._highest_freq / len(self._issues)
@@ -1,13 +1,12 @@
 import logging
-from random import randint
 from time import time
 from typing import cast
 
+import numpy as np
 from geniusweb.actions.Accept import Accept
 from geniusweb.actions.Action import Action
 from geniusweb.actions.Offer import Offer
 from geniusweb.actions.PartyId import PartyId
-from geniusweb.bidspace.AllBidsList import AllBidsList
 from geniusweb.inform.ActionDone import ActionDone
 from geniusweb.inform.Finished import Finished
 from geniusweb.inform.Inform import Inform
@@ -27,6 +26,7 @@ from geniusweb.progress.ProgressTime import ProgressTime
 from geniusweb.references.Parameters import Parameters
 from tudelft_utilities_logging.ReportToLogger import ReportToLogger
 
+from .utils.bid_space_index import BidSpaceIndex
 from .utils.opponent_model import OpponentModel
 
 
@@ -47,6 +47,7 @@ class TemplateAgent(DefaultParty):
         self.other: str = None
         self.settings: Settings = None
         self.storage_dir: str = None
+        self.bid_space: BidSpaceIndex = None
 
         self.last_received_bid: Bid = None
         self.opponent_model: OpponentModel = None
@@ -79,6 +80,8 @@ class TemplateAgent(DefaultParty):
             )
             self.profile = profile_connection.getProfile()
             self.domain = self.profile.getDomain()
+            # encode all possible bids once, so that candidates can be scored in bulk
+            self.bid_space = BidSpaceIndex(self.profile)
             profile_connection.close()
 
         # ActionDone informs you of an action (an offer or an accept)
@@ -203,21 +206,11 @@ class TemplateAgent(DefaultParty):
         return all(conditions)
 
     def find_bid(self) -> Bid:
-        # compose a list of all possible bids
-        domain = self.profile.getDomain()
-        all_bids = AllBidsList(domain)
+        # take 500 random bids and pick the one with the best heuristic score
+        candidates = np.random.randint(0, len(self.bid_space), 500)
+        scores = self.score_bids(candidates)
 
-        best_bid_score = 0.0
-        best_bid = None
-
-        # take 500 attempts to find a bid according to a heuristic score
-        for _ in range(500):
-            bid = all_bids.get(randint(0, all_bids.size() - 1))
-            bid_score = self.score_bid(bid)
-            if bid_score > best_bid_score:
-                best_bid_score, best_bid = bid_score, bid
-
-        return best_bid
+        return self.bid_space[int(candidates[np.argmax(scores)])]
 
     def score_bid(self, bid: Bid, alpha: float = 0.95, eps: float = 0.1) -> float:
         """Calculate heuristic score for a bid
@@ -245,3 +238,31 @@ class TemplateAgent(DefaultParty):
             score += opponent_score
 
         return score
+
+    def score_bids(self, candidates: np.ndarray, alpha: float = 0.95, eps: float = 0.1) -> np.ndarray:
+        """Calculate the heuristic score of `score_bid` for many bids at once
+
+        Args:
+            candidates (np.ndarray): positions of the bids in `self.bid_space`
+            alpha (float, optional): Trade-off factor between self interested and
+                altruistic behaviour. Defaults to 0.95.
+            eps (float, optional): Time pressure factor, balances between conceding
+                and Boulware behaviour over time. Defaults to 0.1.
+
+        Returns:
+            np.ndarray: score of every candidate
+        """
+        progress = self.progress.get(time() * 1000)
+
+        our_utilities = self.bid_space.utilities[candidates]
+
+        time_pressure = 1.0 - progress ** (1 / eps)
+        scores = alpha * time_pressure * our_utilities
+
+        if self.opponent_model is not None:
+            opponent_utilities = self.opponent_model.get_predicted_utilities(
+                self.bid_space.issues, self.bid_space.bids[candidates]
+            )
+            scores += (1.0 - alpha * time_pressure) * opponent_utilities
+
+        return scores
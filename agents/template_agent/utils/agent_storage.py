@@ -0,0 +1,112 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class AgentStorage:
+    """
+    Storage for the learning data of an agent in its `storage_dir`, safe to use
+    from parallel sessions of the same agent. Data is stored per key, where a key
+    is a file name in the storage directory (e.g. one per opponent).
+
+    - Writes are atomic: data is written to a temporary file that is renamed over
+      the old file, so readers see either the old or the new data, never a
+      truncated file.
+    - Read-modify-write cycles (`update_json`) hold an exclusive lock on the key,
+      so parallel sessions do not overwrite each other's updates.
+    """
+
+    def __init__(self, storage_dir: str):
+        self.storage_dir = Path(storage_dir)
+        if not self.storage_dir.exists():
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.storage_dir.joinpath(key)
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    @contextmanager
+    def lock(self, key: str):
+        """Exclusive lock on a key, held while the context is active. The lock is a
+        separate `<key>.lock` file, so the data file itself can be replaced."""
+        with open(self.path(f"{key}.lock"), "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def remove(self, key: str):
+        """Removes a key, if it exists"""
+        if self.exists(key):
+            os.remove(self.path(key))
+
+    def read_text(self, key: str, default: str = None) -> str:
+        if not self.exists(key):
+            return default
+        with open(self.path(key), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write_text(self, key: str, text: str):
+        """Atomically replaces the contents of a key"""
+        self.write_bytes(key, text.encode("utf-8"))
+
+    def write_bytes(self, key: str, data: bytes):
+        """Atomically replaces the contents of a key with binary data"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.storage_dir, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def read_json(self, key: str, default: Any = None) -> Any:
+        text = self.read_text(key)
+        if text is None:
+            return default
+        return json.loads(text)
+
+    def write_json(self, key: str, data: Any, **dump_kwargs):
+        """Atomically replaces the contents of a key with JSON data"""
+        self.write_text(key, json.dumps(data, **dump_kwargs))
+
+    def update_json(self, key: str, update: Callable[[Any], Any], default: Any = None, **dump_kwargs) -> Any:
+        """Reads, updates and writes the JSON data of a key while holding its lock.
+
+        Args:
+            key (str): key to update
+            update (Callable[[Any], Any]): function that gets the current data (or
+                `default` if the key does not exist) and returns the new data
+            default (Any, optional): data of a key that does not exist. Defaults to None.
+
+        Returns:
+            Any: the new data
+        """
+        with self.lock(key):
+            data = update(self.read_json(key, default))
+            self.write_json(key, data, **dump_kwargs)
+        return data
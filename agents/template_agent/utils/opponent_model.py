@@ -1,5 +1,6 @@
-from collections import defaultdict
+from typing import List
 
+import numpy as np
 from geniusweb.issuevalue.Bid import Bid
 from geniusweb.issuevalue.DiscreteValueSet import DiscreteValueSet
 from geniusweb.issuevalue.Domain import Domain
@@ -56,6 +57,38 @@ class OpponentModel:
 
         return predicted_utility
 
+    def get_predicted_utilities(self, issues: List[str], bids: np.ndarray) -> np.ndarray:
+        """Predicted utility of many bids at once, equal to `get_predicted_utility`
+        for every bid.
+
+        Args:
+            issues (List[str]): issue of every column of `bids`
+            bids (np.ndarray): bids as rows of value indices, with the values of an
+                issue in the order of the domain value set (see `BidSpaceIndex`)
+
+        Returns:
+            np.ndarray: predicted utility of every bid
+        """
+        predicted_utilities = np.zeros(len(bids))
+        if len(self.offers) == 0:
+            return predicted_utilities
+
+        # normalise the issue weights such that the sum is 1.0
+        total_issue_weight = sum(
+            issue_estimator.weight for issue_estimator in self.issue_estimators.values()
+        )
+        for j, issue_id in enumerate(issues):
+            issue_estimator = self.issue_estimators[issue_id]
+            if total_issue_weight == 0.0:
+                issue_weight = 1 / len(self.issue_estimators)
+            else:
+                issue_weight = issue_estimator.weight / total_issue_weight
+
+            value_utilities = np.array(issue_estimator.get_value_utilities(), dtype=float)
+            predicted_utilities += issue_weight * value_utilities[bids[:, j]]
+
+        return predicted_utilities
+
 
 class IssueEstimator:
     def __init__(self, value_set: DiscreteValueSet):
@@ -67,20 +100,25 @@ class IssueEstimator:
         self.bids_received = 0
         self.max_value_count = 0
         self.num_values = value_set.size()
-        self.value_trackers = defaultdict(ValueEstimator)
         self.weight = 0
 
+        # every value of the issue has a fixed position in the count and utility arrays
+        self.value_index = {value_set.get(i): i for i in range(self.num_values)}
+        self.value_counts = [0] * self.num_values
+
+        # value utilities are only calculated when they are asked for, and are
+        # cached until the next update
+        self._value_utilities = None
+
     def update(self, value: Value):
         self.bids_received += 1
 
-        # get the value tracker of the value that is offered
-        value_tracker = self.value_trackers[value]
-
         # register that this value was offered
-        value_tracker.update()
+        value_count = self.value_counts[self.value_index[value]] + 1
+        self.value_counts[self.value_index[value]] = value_count
 
         # update the count of the most common offered value
-        self.max_value_count = max([value_tracker.count, self.max_value_count])
+        self.max_value_count = max([value_count, self.max_value_count])
 
         # update predicted issue weight
         # the intuition here is that if the values of the receiverd offers spread out over all
@@ -92,30 +130,33 @@ class IssueEstimator:
             self.bids_received - equal_shares
         )
 
-        # recalculate all value utilities
-        for value_tracker in self.value_trackers.values():
-            value_tracker.recalculate_utility(self.max_value_count, self.weight)
+        # the value utilities depend on the max value count and weight, so are outdated now
+        self._value_utilities = None
 
     def get_value_utility(self, value: Value):
-        if value in self.value_trackers:
-            return self.value_trackers[value].utility
+        if value in self.value_index:
+            return self.get_value_utilities()[self.value_index[value]]
 
         return 0
 
+    def get_value_utilities(self) -> list:
+        """Predicted utility of every value of the issue, in the order of `value_index`"""
+        if self._value_utilities is None:
+            self._value_utilities = [
+                self._calculate_utility(count) for count in self.value_counts
+            ]
 
-class ValueEstimator:
-    def __init__(self):
-        self.count = 0
-        self.utility = 0
+        return self._value_utilities
 
-    def update(self):
-        self.count += 1
+    def _calculate_utility(self, value_count: int):
+        # values that were never offered have no utility
+        if value_count == 0:
+            return 0
 
-    def recalculate_utility(self, max_value_count: int, weight: float):
-        if weight < 1:
-            mod_value_count = ((self.count + 1) ** (1 - weight)) - 1
-            mod_max_value_count = ((max_value_count + 1) ** (1 - weight)) - 1
+        if self.weight < 1:
+            mod_value_count = ((value_count + 1) ** (1 - self.weight)) - 1
+            mod_max_value_count = ((self.max_value_count + 1) ** (1 - self.weight)) - 1
 
-            self.utility = mod_value_count / mod_max_value_count
+            return mod_value_count / mod_max_value_count
         else:
-            self.utility = 1
+            return 1
@@ -15,6 +15,8 @@ if not RESULTS_DIR.exists():
 #   You need to specify the classpath of 2 agents to start a negotiation. Parameters for the agent can be added as a dict (see example)
 #   You need to specify the preference profiles for both agents. The first profile will be assigned to the first agent.
 #   You need to specify a time deadline (is milliseconds (ms)) we are allowed to negotiate before we end without agreement
+#   Optionally, set "engine" to "fast" to run both agents directly in this process instead of through the geniusweb runner
+#   Optionally, set "timing" to True to record the turn latency of both agents in the results summary
 settings = {
     "agents": [
         {
@@ -58,8 +60,8 @@ session_results_trace, session_results_summary = run_session(settings)
 if not session_results_trace["error"]:
     plot_trace(session_results_trace, RESULTS_DIR.joinpath("trace_plot.html"))
 
-# write results to file
+# write results to file, compact and streamed to disk instead of pretty-printed in memory
 with open(RESULTS_DIR.joinpath("session_results_trace.json"), "w", encoding="utf-8") as f:
-    f.write(json.dumps(session_results_trace, indent=2))
+    json.dump(session_results_trace, f)
 with open(RESULTS_DIR.joinpath("session_results_summary.json"), "w", encoding="utf-8") as f:
-    f.write(json.dumps(session_results_summary, indent=2))
+    json.dump(session_results_summary, f)
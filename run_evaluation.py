@@ -1,5 +1,5 @@
-import json
 import os
+from contextlib import ExitStack
 from pathlib import Path
 import time
 
@@ -7,6 +7,8 @@ from agents.group62_agent.utils.opponent_model import DECAY_EXP
 from agents.group62_agent.utils.acceptance_strategy import THRESHOLD
 from agents.group62_agent.utils.bidding_strategy import CONCEDING_SPEED, RESERVATION_VALUE, ISO_TOLERANCE
 
+from utils.parameter_search import sample_configs, successive_halving
+from utils.result_sinks import PARQUET_AVAILABLE, JsonlResultSink, ParquetResultSink
 from utils.runners import run_tournament, run_selfish_tournament
 
 agents_default = [
@@ -197,6 +199,20 @@ profile_sets = [
             ["domains/domain04/profileA.json", "domains/domain04/profileB.json"],
         ]
 
+# Deadline of every session. Use "deadline_rounds" instead of (or together with) "deadline_time_ms" to
+# end sessions after a number of rounds, and "engine": "fast" with "virtual_time": True to make the
+# time deadline independent of CPU speed and machine load.
+deadline = {
+    "deadline_time_ms": 10000,
+    # "deadline_rounds": 1000,
+    # "engine": "fast",
+    # "virtual_time": True,
+}
+
+# Sessions between agents whose code, parameters, profiles and deadline did not change are reused from this
+# cache instead of being replayed for every parameter value. Delete the directory to start from scratch.
+session_cache = Path("eval", "session_cache")
+
 def run_optimisation(params, path='results', key='', agents=agents_default, profile_sets=None):
     '''Runs a tournament with specified parameters'''
 
@@ -241,19 +257,19 @@ def run_optimisation(params, path='results', key='', agents=agents_default, prof
     tournament_settings = {
         "agents": agent_list,
         "profile_sets": profile_sets,
-        "deadline_time_ms": 10000,
+        **deadline,
     }
 
     # NOTE: Select a type of tournament. Selfish only runs first profile against every other profile.
-    # tournament_steps, tournament_results, tournament_results_summary = run_tournament(tournament_settings, ask=False)
-    tournament_steps, tournament_results, tournament_results_summary = run_selfish_tournament(tournament_settings, ask=False, play_with_itself=False)
-
-    # save the tournament settings for reference
-    with open(RESULTS_DIR.joinpath("tournament_steps.json"), "w", encoding="utf-8") as f:
-        f.write(json.dumps(tournament_steps, indent=2))
-    # save the tournament results
-    with open(RESULTS_DIR.joinpath("tournament_results.json"), "w", encoding="utf-8") as f:
-        f.write(json.dumps(tournament_results, indent=2))
+    # The settings and results of every session are streamed to the result sinks while running
+    # (the Parquet file only if pyarrow is installed)
+    with ExitStack() as stack:
+        sinks = [stack.enter_context(JsonlResultSink(RESULTS_DIR.joinpath("tournament_results.jsonl")))]
+        if PARQUET_AVAILABLE:
+            sinks.append(stack.enter_context(ParquetResultSink(RESULTS_DIR.joinpath("tournament_results.parquet"))))
+        # tournament_steps, tournament_results, tournament_results_summary = run_tournament(tournament_settings, ask=False, sinks=sinks, cache=session_cache)
+        tournament_steps, tournament_results, tournament_results_summary = run_selfish_tournament(tournament_settings, ask=False, play_with_itself=False, sinks=sinks, cache=session_cache)
+
     # save the tournament results summary
     # convert all numbers in the CSV to :.2f
     tournament_results_summary.to_csv(RESULTS_DIR.joinpath("tournament_results_summary.csv"))
@@ -300,19 +316,19 @@ def run_comparison(params, path='results', key='', agents=agents_default, profil
     tournament_settings = {
         "agents": agent_list,
         "profile_sets": profile_sets,
-        "deadline_time_ms": 10000,
+        **deadline,
     }
 
     # NOTE: Select a type of tournament. Selfish only runs first profile against every other profile.
-    tournament_steps, tournament_results, tournament_results_summary = run_tournament(tournament_settings, ask=False)
-    # tournament_steps, tournament_results, tournament_results_summary = run_selfish_tournament(tournament_settings, ask=False, play_with_itself=False)
-
-    # save the tournament settings for reference
-    with open(RESULTS_DIR.joinpath("tournament_steps.json"), "w", encoding="utf-8") as f:
-        f.write(json.dumps(tournament_steps, indent=2))
-    # save the tournament results
-    with open(RESULTS_DIR.joinpath("tournament_results.json"), "w", encoding="utf-8") as f:
-        f.write(json.dumps(tournament_results, indent=2))
+    # The settings and results of every session are streamed to the result sinks while running
+    # (the Parquet file only if pyarrow is installed)
+    with ExitStack() as stack:
+        sinks = [stack.enter_context(JsonlResultSink(RESULTS_DIR.joinpath("tournament_results.jsonl")))]
+        if PARQUET_AVAILABLE:
+            sinks.append(stack.enter_context(ParquetResultSink(RESULTS_DIR.joinpath("tournament_results.parquet"))))
+        tournament_steps, tournament_results, tournament_results_summary = run_tournament(tournament_settings, ask=False, sinks=sinks, cache=session_cache)
+        # tournament_steps, tournament_results, tournament_results_summary = run_selfish_tournament(tournament_settings, ask=False, play_with_itself=False, sinks=sinks, cache=session_cache)
+
     # save the tournament results summary
     # convert all numbers in the CSV to :.2f
     tournament_results_summary.to_csv(RESULTS_DIR.joinpath("tournament_results_summary.csv"))
@@ -349,6 +365,31 @@ run_optimisation({}, 'eval3/optimisation', '', all_agents, profile_sets)
 
 
 
+#### NOTE: PARAMETER SEARCH
+# Explores the joint parameter space of Group62Agent with successive halving: every config first plays a
+# few sessions, and only the better half continues with twice as many sessions, until one config is left or
+# all (opponent, profile set) pairs are played.
+def run_parameter_search(space, path='eval/search', agents=agents_default, profile_sets=profile_sets, num_configs=None, workers=1):
+    '''Runs a successive halving search over the parameter space and saves the ranking of the configs'''
+    RESULTS_DIR = Path(path, time.strftime('%Y%m%d-%H%M%S'))
+    if not RESULTS_DIR.exists():
+        RESULTS_DIR.mkdir(parents=True)
+
+    configs = sample_configs(space, num_configs)
+    print(f"Running parameter search over {len(configs)} configs: {path}")
+    search_results = successive_halving(configs, agents, profile_sets, deadline, workers=workers)
+    search_results.to_csv(RESULTS_DIR.joinpath("search_results.csv"), index=False)
+
+    return search_results
+
+# search_space = {
+#     'conceding_speed': np.logspace(-6, -2, 10).tolist(),
+#     'threshold': np.linspace(0.80, 0.999, 10).tolist(),
+#     'decay_exp': np.linspace(0.1, 1, 10).tolist(),
+# }
+# run_parameter_search(search_space, agents=agents_default, num_configs=64)
+
+
 # #### NOTE: PARAMETER OPTIMISATION
 # # Generate linspaces for each parameter
 # conceding_speeds = np.logspace(-6, -2, 20).tolist()
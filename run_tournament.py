@@ -1,8 +1,9 @@
-import json
 import os
+from contextlib import ExitStack
 from pathlib import Path
 import time
 
+from utils.result_sinks import PARQUET_AVAILABLE, ParquetResultSink
 from utils.runners import run_tournament, run_selfish_tournament
 
 RESULTS_DIR = Path("results", time.strftime('%Y%m%d-%H%M%S'))
@@ -15,6 +16,7 @@ if not RESULTS_DIR.exists():
 #   You need to specify the classpath of 2 agents to start a negotiation. Parameters for the agent can be added as a dict (see example)
 #   You need to specify the preference profiles for both agents. The first profile will be assigned to the first agent.
 #   You need to specify a time deadline (is milliseconds (ms)) we are allowed to negotiate before we end without agreement.
+#   Instead of a time deadline, a rounds deadline ("deadline_rounds") can be used to make results independent of CPU speed.
 tournament_settings = {
     "agents": [
         {
@@ -152,17 +154,27 @@ tournament_settings = {
         ["domains/domain09/profileA.json", "domains/domain09/profileB.json"],
     ],
     "deadline_time_ms": 10000,
+    # NOTE: Alternatively, end sessions after a number of rounds (the time deadline then only caps the wall-clock time)
+    # "deadline_rounds": 1000,
+    # NOTE: Uncomment to add per-agent turn latency and offers/sec columns to the summary
+    # "timing": True,
 }
 
 # NOTE: Select a type of tournament. Selfish only runs first profile against every other profile.
-tournament_steps, tournament_results, tournament_results_summary = run_tournament(tournament_settings)
+# Finished sessions are appended to the journal right away. To continue a crashed or interrupted
+# tournament, point RESULTS_DIR to its results directory and pass resume=True.
+# The journal holds the settings and results of every session. If pyarrow is installed, the sessions
+# are also written to a typed tournament_results.parquet.
+with ExitStack() as stack:
+    sinks = []
+    if PARQUET_AVAILABLE:
+        sinks.append(stack.enter_context(ParquetResultSink(RESULTS_DIR.joinpath("tournament_results.parquet"))))
+    tournament_steps, tournament_results, tournament_results_summary = run_tournament(
+        tournament_settings,
+        journal=RESULTS_DIR.joinpath("tournament_journal.jsonl"),
+        sinks=sinks,
+    )
 
-# save the tournament settings for reference
-with open(RESULTS_DIR.joinpath("tournament_steps.json"), "w", encoding="utf-8") as f:
-    f.write(json.dumps(tournament_steps, indent=2))
-# save the tournament results
-with open(RESULTS_DIR.joinpath("tournament_results.json"), "w", encoding="utf-8") as f:
-    f.write(json.dumps(tournament_results, indent=2))
 # save the tournament results summary
 tournament_results_summary.to_csv(RESULTS_DIR.joinpath("tournament_results_summary.csv"))
 
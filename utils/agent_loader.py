@@ -0,0 +1,144 @@
+import argparse
+import importlib
+import json
+import re
+import subprocess
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+# agent classes are recognised by subclassing DefaultParty directly
+AGENT_CLASS_PATTERN = re.compile(r"^class (\w+)\(.*DefaultParty\)", re.MULTILINE)
+
+# measures the import of a single agent class, run in a fresh interpreter with `-X importtime`
+_PROFILE_SCRIPT = """
+import importlib, json, sys, time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def rss_mb():
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2 ** 20 if sys.platform == "darwin" else maxrss / 2 ** 10
+
+rss_before, start = rss_mb(), time.perf_counter()
+try:
+    module_name, class_name = sys.argv[1].rsplit(".", 1)
+    getattr(importlib.import_module(module_name), class_name)
+    error = None
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+print(json.dumps({
+    "import_ms": (time.perf_counter() - start) * 1000,
+    "rss_delta_mb": rss_mb() - rss_before if resource is not None else None,
+    "error": error,
+}))
+"""
+
+
+@lru_cache(maxsize=None)
+def load_agent_class(class_path: str) -> type:
+    """Imports an agent class by its class path, only when it is first used.
+
+    Args:
+        class_path (str): class path, e.g. "agents.linear_agent.linear_agent.LinearAgent"
+
+    Returns:
+        type: the agent class
+    """
+    module_name, class_name = class_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def find_agent_classes(root="agents") -> List[str]:
+    """Class paths of all agents in a directory, found without importing them.
+
+    Args:
+        root (str, optional): directory to search, relative to the working
+            directory. Defaults to "agents".
+
+    Returns:
+        List[str]: sorted class paths
+    """
+    class_paths = []
+    for source in Path(root).rglob("*.py"):
+        module_name = ".".join(source.with_suffix("").parts)
+        for class_name in AGENT_CLASS_PATTERN.findall(source.read_text(encoding="utf-8", errors="ignore")):
+            class_paths.append(f"{module_name}.{class_name}")
+
+    return sorted(class_paths)
+
+
+def profile_import(class_path: str, top: int = 5) -> dict:
+    """Measures the import time and memory of an agent class in a fresh interpreter,
+    so that modules imported by other agents do not hide its costs.
+
+    Args:
+        class_path (str): class path of the agent
+        top (int, optional): number of slowest modules to report. Defaults to 5.
+
+    Returns:
+        dict: import time (ms), RSS delta (MB, None on Windows), error and the
+            slowest modules by cumulative import time
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROFILE_SCRIPT, class_path],
+        capture_output=True,
+        text=True,
+    )
+    try:
+        profile = json.loads(process.stdout.strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        profile = {"import_ms": None, "rss_delta_mb": None, "error": process.stderr.strip()[-200:]}
+
+    # lines look like "import time:       123 |       4567 |   package.module"
+    modules = []
+    for line in process.stderr.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or not fields[1].strip().isdigit():
+            continue
+        modules.append((fields[2].strip(), int(fields[1]) / 1000))
+    modules.sort(key=lambda module: module[1], reverse=True)
+
+    profile["class"] = class_path
+    profile["slowest_modules"] = ", ".join(f"{name} ({ms:.0f} ms)" for name, ms in modules[:top])
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and load agent classes.")
+    parser.add_argument("classes", nargs="*", help="class paths of agents (default: all agents)")
+    parser.add_argument("--list", action="store_true", help="list the class paths of all agents")
+    parser.add_argument(
+        "--import-profile",
+        action="store_true",
+        help="report import time, RSS delta and slowest modules of every agent",
+    )
+    parser.add_argument("--top", type=int, default=5, help="number of slowest modules to report")
+    parser.add_argument("--output", type=Path, help="also write the import profile to this CSV file")
+    args = parser.parse_args(argv)
+
+    class_paths = args.classes or find_agent_classes()
+
+    if args.list:
+        print("\n".join(class_paths))
+
+    if args.import_profile:
+        report = pd.DataFrame([profile_import(class_path, args.top) for class_path in class_paths])
+        report = report[["class", "import_ms", "rss_delta_mb", "slowest_modules", "error"]]
+        report.sort_values("import_ms", ascending=False, inplace=True)
+        if args.output:
+            report.to_csv(args.output, index=False)
+        with pd.option_context("display.max_colwidth", 120, "display.width", 250):
+            print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
+import argparse
 import json
 import math
 import os
+import random
+from concurrent.futures import ProcessPoolExecutor
 from itertools import product
 from math import sqrt
 from random import randint
@@ -13,14 +16,72 @@ import plotly.graph_objects as go
 from numpy.random import dirichlet
 
 NUM_DOMAINS_TO_GENERATE = 50
-
-
-def main():
-    for i in range(NUM_DOMAINS_TO_GENERATE):
-        domain = Domain.create_random(f"domain{i:03d}")
-        domain.calculate_specials()
+# range of the number of bids in a generated domain
+DOMAIN_SIZE_RANGE = (200, 10000)
+# maximum number of (bid, Pareto bid) pairs to calculate distances for at once
+DISTANCE_CHUNK_SIZE = 2**20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate random negotiation domains.")
+    parser.add_argument("--num-domains", type=int, default=NUM_DOMAINS_TO_GENERATE)
+    parser.add_argument("--output", default="domains/", help="directory to write the domains to")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes to generate domains with")
+    parser.add_argument("--seed", type=int, default=None, help="seed to make the generated domains reproducible")
+    parser.add_argument("--no-visualisation", action="store_true", help="skip rendering visualisation.pdf")
+    parser.add_argument(
+        "--size-range", type=int, nargs=2, default=DOMAIN_SIZE_RANGE, metavar=("MIN", "MAX"),
+        help="range of the number of bids in a domain",
+    )
+    args = parser.parse_args(argv)
+
+    # every domain gets its own seed, so it can be regenerated on its own
+    seeds = np.random.SeedSequence(args.seed).generate_state(args.num_domains).tolist()
+    jobs = [
+        (f"domain{i:03d}", seed, tuple(args.size_range), not args.no_visualisation, args.output)
+        for i, seed in enumerate(seeds)
+    ]
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            manifest = list(executor.map(generate_domain, *zip(*jobs)))
+    else:
+        manifest = [generate_domain(*job) for job in jobs]
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "manifest.json"), "w") as f:
+        f.write(json.dumps(manifest, indent=2))
+
+
+def generate_domain(name, seed, size_range=DOMAIN_SIZE_RANGE, visualisation=True, parent_path="domains/"):
+    """generate a random domain from a seed, calculate its specials and write it to file
+
+    Args:
+        name (str): name of the domain
+        seed (int): seed of the random number generators
+        size_range (tuple[int, int], optional): range of the number of bids in the domain.
+        visualisation (bool, optional): whether to render visualisation.pdf. Defaults to True.
+        parent_path (str, optional): directory to write the domain to. Defaults to "domains/".
+
+    Returns:
+        dict: manifest entry with the seed, size, opposition and distribution of the domain
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+    domain = Domain.create_random(name, size_range)
+    domain.calculate_specials()
+    if visualisation:
         domain.generate_visualisation()
-        domain.to_file("domains/")
+    domain.to_file(parent_path)
+
+    return {
+        "name": name,
+        "seed": seed,
+        "size": domain.get_size(),
+        "opposition": domain.opposition,
+        "distribution": domain.distribution,
+    }
 
 
 class Profile:
@@ -103,6 +164,27 @@ class Profile:
             self.issue_weights[i] * self.value_weights[i][v] for i, v in bid.items()
         )
 
+    def get_utility_array(self, issues: list, values: list, bid_index: np.ndarray):
+        """calculate the utility of many bids at once. The result is bitwise equal to
+        calling `get_utility` on every bid, as the issues are summed in the same order.
+
+        Args:
+            issues (list[str]): issues of the domain
+            values (list[list[str]]): values per issue
+            bid_index (np.ndarray): bids as value indices, shape (bids, issues)
+
+        Returns:
+            np.ndarray: utility per bid
+        """
+        utility = np.zeros(len(bid_index))
+        for j, (issue, issue_values) in enumerate(zip(issues, values)):
+            weighted_values = np.array(
+                [self.issue_weights[issue] * self.value_weights[issue][v] for v in issue_values],
+                dtype=np.float64,
+            )
+            utility = utility + weighted_values[bid_index[:, j]]
+        return utility
+
 
 class Domain:
     def __init__(
@@ -130,8 +212,8 @@ class Domain:
         self.visualisation = visualisation
 
     @classmethod
-    def create_random(cls, name):
-        domain_size = randint(200, 10000)
+    def create_random(cls, name, size_range=DOMAIN_SIZE_RANGE):
+        domain_size = randint(*size_range)
 
         while True:
             num_issues = randint(4, 10)
@@ -182,8 +264,8 @@ class Domain:
     def calculate_specials(self):
         if self.nash_bid:
             return False
-        self.pareto_front = self.get_pareto(list(self.iter_bids()))
-        self.distribution = self.get_distribution(self.iter_bids())
+        self.pareto_front = self.get_pareto()
+        self.distribution = self.get_distribution()
 
         SW_utility = 0
         nash_utility = 0
@@ -268,7 +350,7 @@ class Domain:
 
         fig.update_layout(
             title=dict(
-                text=f"{self.get_name()}<br><sub>(size: {len(list(self.iter_bids()))}, opposition: {self.opposition:.4f}, distribution: {self.distribution:.4f})</sub>",
+                text=f"{self.get_name()}<br><sub>(size: {self.get_size()}, opposition: {self.opposition:.4f}, distribution: {self.distribution:.4f})</sub>",
                 x=0.5,
                 xanchor="center",
             )
@@ -292,7 +374,7 @@ class Domain:
                 f.write(
                     json.dumps(
                         {
-                            "size": len(list(self.iter_bids())),
+                            "size": self.get_size(),
                             "opposition": self.opposition,
                             "distribution": self.distribution,
                             "social_welfare": self.SW_bid,
@@ -312,81 +394,119 @@ class Domain:
     def iter_bids(self) -> Iterable:
         return iter(self)
 
+    def get_size(self) -> int:
+        """number of bids in the domain, without enumerating them"""
+        return int(np.prod([len(v["values"]) for v in self.domain["issuesValues"].values()]))
+
     def get_utilities(self, bid):
         return self.profile_A.get_utility(bid), self.profile_B.get_utility(bid)
 
-    def get_pareto(self, all_bids: list):
-        pareto_front = []
-        # dominated_bids = set()
-        while True:
-            candidate_bid = all_bids.pop(0)
-            bid_nr = 0
-            dominated = False
-            while len(all_bids) != 0 and bid_nr < len(all_bids):
-                bid = all_bids[bid_nr]
-                if self._dominates(candidate_bid, bid):
-                    # If it is dominated remove the bid from all bids
-                    all_bids.pop(bid_nr)
-                    # dominated_bids.add(frozenset(bid.items()))
-                elif self._dominates(bid, candidate_bid):
-                    dominated = True
-                    # dominated_bids.add(frozenset(candidate_bid.items()))
-                    bid_nr += 1
-                else:
-                    bid_nr += 1
-
-            if not dominated:
-                # add the non-dominated bid to the Pareto frontier
-                pareto_front.append(
-                    {
-                        "bid": candidate_bid,
-                        "utility": [
-                            self.profile_A.get_utility(candidate_bid),
-                            self.profile_B.get_utility(candidate_bid),
-                        ],
-                    }
-                )
+    def get_bid_index(self):
+        """encode all bids of the domain (in `iter_bids` order) as value indices
 
-            if len(all_bids) == 0:
-                break
+        Returns:
+            tuple[list[str], list[list[str]], np.ndarray]: issues, values per issue
+                and the bids as value indices with shape (bids, issues)
+        """
+        issues = list(self.domain["issuesValues"].keys())
+        values = [v["values"] for v in self.domain["issuesValues"].values()]
+        shape = [len(v) for v in values]
+        bid_index = np.indices(shape).reshape(len(shape), -1).T
+        return issues, values, bid_index
+
+    def get_utility_matrix(self) -> np.ndarray:
+        """utilities of all bids (in `iter_bids` order) with shape (bids, 2),
+        where the columns are the utilities of profile A and B.
+        """
+        issues, values, bid_index = self.get_bid_index()
+        return np.stack(
+            [
+                self.profile_A.get_utility_array(issues, values, bid_index),
+                self.profile_B.get_utility_array(issues, values, bid_index),
+            ],
+            axis=1,
+        )
+
+    def get_pareto(self, all_bids: list = None):
+        if all_bids is None:
+            all_bids = list(self.iter_bids())
+            utilities = self.get_utility_matrix()
+        else:
+            utilities = np.array(
+                [self.get_utilities(bid) for bid in all_bids], dtype=np.float64
+            ).reshape(-1, 2)
+
+        # sort on utility A descending, then utility B descending. Ties are broken on the
+        # original bid order, so of bids with equal utilities only the first one is kept.
+        order = np.lexsort(
+            (np.arange(len(utilities)), -utilities[:, 1], -utilities[:, 0])
+        )
 
-        pareto_front = sorted(pareto_front, key=lambda d: d["utility"][0])
+        # sweep: a bid is Pareto optimal if its utility B beats all bids before it
+        sorted_utility_B = utilities[order, 1]
+        previous_max_B = np.concatenate(
+            ([-np.inf], np.maximum.accumulate(sorted_utility_B)[:-1])
+        )
+        pareto_indices = order[sorted_utility_B > previous_max_B]
+
+        pareto_front = [
+            {
+                "bid": all_bids[i],
+                "utility": [
+                    self.profile_A.get_utility(all_bids[i]),
+                    self.profile_B.get_utility(all_bids[i]),
+                ],
+            }
+            for i in reversed(pareto_indices)
+        ]
 
         return pareto_front
 
-    def get_distribution(self, bids_iter) -> float:
-        min_distance_sum = 0.0
-
-        for i, bid in enumerate(bids_iter):
-            min_distance = self.distance_to_pareto(bid)
-            min_distance_sum += min_distance
+    def get_distribution(self, bids_iter=None) -> float:
+        if bids_iter is None:
+            utilities = self.get_utility_matrix()
+        else:
+            utilities = np.array(
+                [self.get_utilities(bid) for bid in bids_iter], dtype=np.float64
+            ).reshape(-1, 2)
 
-        distribution = min_distance_sum / (i + 1)
+        distribution = float(np.mean(self.distances_to_pareto(utilities)))
 
         return distribution
 
-    def _dominates(self, bid, candidate_bid):
-        if self.profile_A.get_utility(bid) < self.profile_A.get_utility(candidate_bid):
-            return False
-        elif self.profile_B.get_utility(bid) < self.profile_B.get_utility(
-            candidate_bid
-        ):
-            return False
-        else:
-            return True
-
     def distance_to_pareto(self, bid):
+        utilities = np.array([self.get_utilities(bid)], dtype=np.float64)
+        return float(self.distances_to_pareto(utilities)[0])
+
+    def distances_to_pareto(self, utilities: np.ndarray) -> np.ndarray:
+        """calculate the minimal Euclidian distance in terms of utility between bids and the Pareto front.
+        Bids are processed in chunks, so memory use stays bounded for large domains.
+
+        Args:
+            utilities (np.ndarray): utilities of the bids for profile A and B, shape (bids, 2)
+
+        Returns:
+            np.ndarray: minimal distance to the Pareto front per bid
+        """
         if not self.pareto_front:
             raise ValueError("Pareto front not calculated")
 
-        min_distance = 5.0
-        for pareto_element in self.pareto_front:
-            pareto_bid = pareto_element["bid"]
-            distance = self.distance(pareto_bid, bid)
-            if distance < min_distance:
-                min_distance = distance
+        pareto_utilities = np.array(
+            [pareto_element["utility"] for pareto_element in self.pareto_front],
+            dtype=np.float64,
+        )
+        chunk_size = max(1, DISTANCE_CHUNK_SIZE // len(pareto_utilities))
+
+        min_distances = np.empty(len(utilities))
+        for start in range(0, len(utilities), chunk_size):
+            chunk = utilities[start : start + chunk_size]
+            differences = chunk[:, np.newaxis, :] - pareto_utilities[np.newaxis, :, :]
+            squared_distances = np.sum(differences**2, axis=2)
+            min_distances[start : start + chunk_size] = np.sqrt(
+                np.min(squared_distances, axis=1)
+            )
 
-        return min_distance
+        return min_distances
 
     def distance(self, bid1, bid2=None):
         """calculate Euclidian distance in terms of utility between a bid and 0 or between two bids.
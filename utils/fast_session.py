@@ -0,0 +1,277 @@
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import count
+from time import time
+from typing import List, Optional, Tuple
+
+from geniusweb.actions.Accept import Accept
+from geniusweb.actions.Action import Action
+from geniusweb.actions.EndNegotiation import EndNegotiation
+from geniusweb.actions.Offer import Offer
+from geniusweb.actions.PartyId import PartyId
+from geniusweb.inform.ActionDone import ActionDone
+from geniusweb.inform.Agreements import Agreements
+from geniusweb.inform.Finished import Finished
+from geniusweb.inform.Inform import Inform
+from geniusweb.inform.Settings import Settings
+from geniusweb.inform.YourTurn import YourTurn
+from geniusweb.party.DefaultParty import DefaultParty
+from geniusweb.progress.ProgressRounds import ProgressRounds
+from geniusweb.progress.ProgressTime import ProgressTime
+from geniusweb.references.Parameters import Parameters
+from geniusweb.references.ProfileRef import ProfileRef
+from geniusweb.references.ProtocolRef import ProtocolRef
+from uri.uri import URI
+
+from utils.agent_loader import load_agent_class
+
+# party ids are numbered over all sessions in this process, like geniusweb does
+_party_counter = count(1)
+
+
+class VirtualClock:
+    """
+    Clock that only moves when the session driver advances it, used to make
+    sessions independent of CPU speed and machine load.
+    """
+
+    def __init__(self):
+        self.time_ms = 0
+
+    def advance(self, ms: int = 1):
+        self.time_ms += ms
+
+
+class VirtualProgressTime(ProgressTime):
+    """
+    ProgressTime that ignores the wall-clock time that agents pass to it and
+    reports progress on a shared `VirtualClock` instead.
+    """
+
+    def __init__(self, duration: int, start: datetime, clock: VirtualClock):
+        super().__init__(duration, start)
+        self._clock = clock
+
+    def get(self, currentTimeMs: int) -> float:
+        return min(1.0, self._clock.time_ms / self.getDuration())
+
+    def isPastDeadline(self, currentTimeMs: int) -> bool:
+        return self._clock.time_ms >= self.getDuration()
+
+
+class FastSessionState:
+    """
+    Minimal stand-in for `SAOPState` that offers what `process_results` needs.
+    """
+
+    def __init__(self, actions: List[Action]):
+        self._actions = actions
+
+    def getActions(self) -> List[Action]:
+        return self._actions
+
+
+class _PartyConnection:
+    """
+    In-process connection between the session driver and a party. Informs are
+    delivered by calling the listeners directly and actions that the party sends
+    are queued until the driver picks them up.
+    """
+
+    def __init__(self):
+        self._listeners = []
+        self.actions: List[Action] = []
+        self.closed = False
+
+    def addListener(self, listener):
+        self._listeners.append(listener)
+
+    def removeListener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def send(self, action: Action):
+        self.actions.append(action)
+
+    def inform(self, data: Inform):
+        for listener in list(self._listeners):
+            listener.notifyChange(data)
+
+    def getError(self):
+        return None
+
+    def close(self):
+        self.closed = True
+
+
+def run_fast_session(settings: dict) -> Tuple[FastSessionState, dict]:
+    """Runs a SAOP session between two parties in this process, without the
+    geniusweb settings parsing, runner and connection factory.
+
+    Next to the wall-clock `deadline_time_ms`, the session can end after
+    `deadline_rounds` rounds. With `virtual_time`, the agents get a
+    `VirtualProgressTime` that advances 1 ms per action instead of with the
+    wall clock, so the outcome does not depend on how fast the machine is.
+
+    Args:
+        settings (dict): session settings, see `run_session`
+
+    Returns:
+        Tuple[FastSessionState, dict]: session state and its dict representation
+            in the same format as the JSON of a `SAOPState`
+    """
+    agents = settings["agents"]
+    profiles_uri = [f"file:{x}" for x in settings["profiles"]]
+    deadline_time_ms = settings["deadline_time_ms"]
+    deadline_rounds = settings.get("deadline_rounds")
+    virtual_time = settings.get("virtual_time", False)
+
+    logger = logging.getLogger("geniusweb")
+
+    party_ids: List[PartyId] = []
+    parties: List[DefaultParty] = []
+    connections: List[_PartyConnection] = []
+    partyprofiles = {}
+
+    for agent, profile_uri in zip(agents, profiles_uri):
+        party_class = load_agent_class(agent["class"])
+        class_name = agent["class"].rsplit(".", 1)[1]
+        parameters = agent["parameters"] if "parameters" in agent else {}
+
+        party_id = PartyId(f"{class_name}_{next(_party_counter)}")
+        party = party_class()
+        connection = _PartyConnection()
+        party.connect(connection)
+
+        party_ids.append(party_id)
+        parties.append(party)
+        connections.append(connection)
+        partyprofiles[str(party_id)] = {
+            "party": {"partyref": f"pythonpath:{agent['class']}", "parameters": parameters},
+            "profile": profile_uri,
+        }
+
+    actions: List[Action] = []
+    agreement = None
+    error: Optional[str] = None
+
+    start = datetime.now()
+    deadline = time() * 1000 + deadline_time_ms
+    clock = VirtualClock() if virtual_time else None
+    rounds = 0
+
+    if deadline_rounds:
+        end = start + timedelta(milliseconds=deadline_time_ms)
+        progress = ProgressRounds(deadline_rounds, 0, end)
+    elif virtual_time:
+        progress = VirtualProgressTime(deadline_time_ms, start, clock)
+    else:
+        progress = ProgressTime(deadline_time_ms, start)
+
+    def past_deadline() -> bool:
+        if deadline_rounds and rounds >= deadline_rounds:
+            return True
+        if virtual_time:
+            return clock.time_ms >= deadline_time_ms
+        return time() * 1000 >= deadline
+
+    try:
+        for party_id, connection, agent, profile_uri in zip(
+            party_ids, connections, agents, profiles_uri
+        ):
+            parameters = agent["parameters"] if "parameters" in agent else {}
+            connection.inform(
+                Settings(
+                    party_id,
+                    ProfileRef(URI(profile_uri)),
+                    ProtocolRef(URI("SAOP")),
+                    progress,
+                    Parameters(parameters),
+                )
+            )
+
+        current = 0
+        while not past_deadline():
+            connection = connections[current]
+            connection.inform(YourTurn())
+
+            # actions sent after the deadline are not part of the negotiation
+            if not virtual_time and time() * 1000 >= deadline:
+                break
+            if not connection.actions:
+                error = f"{party_ids[current]} did not act on YourTurn"
+                break
+
+            action = connection.actions.pop(0)
+            error = _check_action(action, party_ids[current], actions)
+            if error:
+                break
+
+            actions.append(action)
+            for other in connections:
+                other.inform(ActionDone(action))
+
+            if isinstance(action, Accept):
+                agreement = action.getBid()
+                break
+            if isinstance(action, EndNegotiation):
+                break
+
+            # a round is finished when every party acted once
+            if current == len(parties) - 1:
+                rounds += 1
+            if virtual_time:
+                clock.advance()
+
+            current = (current + 1) % len(parties)
+    except Exception as e:
+        logger.log(logging.WARNING, "party failed during session", exc_info=e)
+        error = f"{type(e).__name__}: {e}"
+
+    agreements = {party_id: agreement for party_id in party_ids} if agreement else {}
+    for party_id, connection in zip(party_ids, connections):
+        try:
+            connection.inform(Finished(Agreements(agreements)))
+        except Exception as e:
+            logger.log(logging.WARNING, f"{party_id} failed on Finished", exc_info=e)
+
+    results_dict = {
+        "actions": [_action_to_dict(action) for action in actions],
+        "connections": [str(party_id) for party_id in party_ids],
+        "partyprofiles": partyprofiles,
+        "error": error,
+    }
+
+    return FastSessionState(actions), results_dict
+
+
+def _check_action(action: Action, party_id: PartyId, actions: List[Action]) -> Optional[str]:
+    """Returns an error message if the action breaks the SAOP protocol"""
+    if action.getActor() != party_id:
+        return f"{party_id} sent an action for {action.getActor()}"
+
+    if isinstance(action, Offer):
+        if action.getBid() is None:
+            return f"{party_id} offered a `None` bid"
+    elif isinstance(action, Accept):
+        offers = [a for a in actions if isinstance(a, Offer)]
+        if not offers or offers[-1].getBid() != action.getBid():
+            return f"{party_id} accepted a bid that was not the last offer"
+    elif not isinstance(action, EndNegotiation):
+        return f"{party_id} sent an unsupported action {action}"
+
+    return None
+
+
+def _action_to_dict(action: Action) -> dict:
+    """Dict representation of an action, as produced by geniusweb's ObjectMapper"""
+    action_dict = {"actor": str(action.getActor())}
+    if isinstance(action, (Offer, Accept)):
+        issuevalues = {}
+        for issue, value in action.getBid().getIssueValues().items():
+            value = value.getValue()
+            issuevalues[issue] = float(value) if isinstance(value, Decimal) else value
+        action_dict["bid"] = {"issuevalues": issuevalues}
+
+    return {type(action).__name__: action_dict}
@@ -0,0 +1,63 @@
+import argparse
+import json
+from pathlib import Path
+from typing import List
+
+from agents.ANL2022.learning_agent.LearnedData import LearnedData
+from agents.template_agent.utils.agent_storage import AgentStorage
+
+
+def migrate_learned_data(storage_dir, remove_json: bool = False, overwrite: bool = False) -> List[str]:
+    """Converts the json learned data of LearningAgent and CompromisingAgent in a
+    storage directory (`learnedData_<opponent>.json`) to their binary format
+    (`learnedData_<opponent>.npy`). Both agents share the same LearnedData format.
+    The list of agreement utilities is reduced to the running sums that the
+    standard deviation is computed from.
+
+    Args:
+        storage_dir: storage directory of the agent
+        remove_json (bool, optional): remove the json files after converting them.
+            Defaults to False.
+        overwrite (bool, optional): convert opponents that already have binary
+            learned data, which is replaced. Defaults to False.
+
+    Returns:
+        List[str]: keys of the binary learned data that was written
+    """
+    storage = AgentStorage(storage_dir)
+
+    migrated = []
+    for json_path in sorted(Path(storage_dir).glob("learnedData_*.json")):
+        key = json_path.with_suffix(".npy").name
+        if storage.exists(key) and not overwrite:
+            continue
+
+        learned_data = LearnedData()
+        with open(json_path, "r", encoding="utf-8") as f:
+            learned_data.encode(list(json.load(f).values()))
+
+        # the lock of the key keeps running agents from merging into it halfway
+        with storage.lock(key):
+            learned_data.save(storage, key)
+        migrated.append(key)
+
+        if remove_json:
+            json_path.unlink()
+
+    return migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert json learned data of LearningAgent/CompromisingAgent to binary.")
+    parser.add_argument("storage_dirs", nargs="+", type=Path, help="storage directories of the agents")
+    parser.add_argument("--remove-json", action="store_true", help="remove the json files after converting them")
+    parser.add_argument("--overwrite", action="store_true", help="replace existing binary learned data")
+    args = parser.parse_args(argv)
+
+    for storage_dir in args.storage_dirs:
+        migrated = migrate_learned_data(storage_dir, args.remove_json, args.overwrite)
+        print(f"{storage_dir}: converted {len(migrated)} opponents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import logging
+import random
+from itertools import product
+from math import ceil
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from utils.result_sinks import result_row
+from utils.runners import run_sessions, session_settings
+from utils.session_journal import SessionJournal
+
+GROUP62_CLASS = "agents.group62_agent.group62_agent.Group62Agent"
+
+# parameter dict of Group62Agent that every search parameter belongs to
+GROUP62_PARAMETER_GROUPS = {
+    "conceding_speed": "bidding_strategy",
+    "reservation_value": "bidding_strategy",
+    "iso_tolerance": "bidding_strategy",
+    "threshold": "acceptance_strategy",
+    "decay_exp": "opponent_model",
+}
+
+
+def group62_parameters(config: dict, storage_dir: str = "agent_storage/Group62Agent") -> dict:
+    """Turns a flat parameter config into the nested parameters of Group62Agent.
+
+    Args:
+        config (dict): parameter name -> value, see `GROUP62_PARAMETER_GROUPS`
+        storage_dir (str, optional): storage directory of the agent.
+            Defaults to "agent_storage/Group62Agent".
+
+    Returns:
+        dict: agent parameters
+    """
+    parameters = {"storage_dir": storage_dir}
+    for name, value in config.items():
+        group = GROUP62_PARAMETER_GROUPS[name]
+        parameters.setdefault(group, {})[name] = value
+        if name == "decay_exp":
+            # a negative exponent disables the decay, like in `run_comparison`
+            parameters[group]["decay"] = value >= 0
+
+    return parameters
+
+
+def sample_configs(space: Dict[str, list], n: Optional[int] = None, seed: int = 0) -> List[dict]:
+    """Configs from the joint grid of a parameter space.
+
+    Args:
+        space (Dict[str, list]): parameter name -> candidate values
+        n (Optional[int], optional): number of configs to sample without replacement.
+            Defaults to None, which gives the full grid.
+        seed (int, optional): seed of the sample. Defaults to 0.
+
+    Returns:
+        List[dict]: parameter configs
+    """
+    names = list(space)
+    grid = [dict(zip(names, values)) for values in product(*space.values())]
+    if n is None or n >= len(grid):
+        return grid
+
+    return random.Random(seed).sample(grid, n)
+
+
+def successive_halving(
+    configs: List[dict],
+    opponents: List[dict],
+    profile_sets: List[list],
+    session_defaults: Optional[dict] = None,
+    eta: int = 2,
+    min_sessions: int = 4,
+    workers: int = 1,
+    seed: int = 0,
+    storage_dir: str = "agent_storage/Group62Agent",
+) -> pd.DataFrame:
+    """Searches the best Group62Agent parameter config with successive halving.
+
+    All (opponent, profile set) pairs are shuffled once into a fixed order of
+    sessions. In every rung, the remaining configs play the first
+    `min_sessions * eta ** rung` sessions of that order (sessions of earlier rungs
+    are not played again), after which only the best `1 / eta` of the configs
+    on average utility go to the next rung. Bad configs are thus dropped after a
+    few sessions, and most sessions are spent on the promising ones.
+
+    Args:
+        configs (List[dict]): flat parameter configs, see `sample_configs`
+        opponents (List[dict]): opponent agents as in the tournament settings
+        profile_sets (List[list]): profile pairs, the config agent gets the first profile
+        session_defaults (Optional[dict], optional): deadline and engine settings of
+            every session (see `session_settings`). Defaults to None.
+        eta (int, optional): factor by which the configs are reduced and the
+            sessions increased per rung. Defaults to 2.
+        min_sessions (int, optional): sessions per config in the first rung. Defaults to 4.
+        workers (int, optional): number of processes to run sessions in. Defaults to 1.
+        seed (int, optional): seed of the session order. Defaults to 0.
+        storage_dir (str, optional): parent of the storage directories of the config
+            agents, one per config and rung (`config_<i>/rung_<r>`). A config thus
+            starts every rung without the data it learned in earlier rungs.
+            Defaults to "agent_storage/Group62Agent".
+
+    Returns:
+        pd.DataFrame: one row per config with its parameters, the number of sessions
+            played, its average utility and the last rung it reached, best first
+    """
+    assert eta >= 2 and min_sessions >= 1
+    logger = logging.getLogger("parameter search")
+    session_defaults = session_defaults or {}
+
+    tasks = list(product(opponents, profile_sets))
+    random.Random(seed).shuffle(tasks)
+
+    utilities = [[] for _ in configs]
+    rungs = [0 for _ in configs]
+    remaining = list(range(len(configs)))
+    rung = 0
+
+    while True:
+        budget = min(len(tasks), min_sessions * eta ** rung)
+
+        # only play the sessions that the remaining configs did not play yet
+        sessions, owners = [], []
+        for c in remaining:
+            # every config and rung learns in its own storage_dir, so the learned data of
+            # other configs does not skew the comparison
+            config_storage_dir = f"{storage_dir}/config_{c}/rung_{rung}"
+            agent = {"class": GROUP62_CLASS, "parameters": group62_parameters(configs[c], config_storage_dir)}
+            for opponent, profiles in tasks[len(utilities[c]):budget]:
+                sessions.append(session_settings(session_defaults, [agent, opponent], profiles))
+                owners.append(c)
+
+        logger.warning(f"Rung {rung}: {len(remaining)} configs, {budget} sessions each ({len(sessions)} new)")
+        for index, summary in run_sessions(sessions, workers):
+            key = SessionJournal.session_key(sessions[index])
+            # sessions that crashed before the agents connected have no utilities, like
+            # sessions without agreement they count as utility 0
+            utilities[owners[index]].append(result_row(key, sessions[index], summary).get("utility_a", 0.0))
+        for c in remaining:
+            rungs[c] = rung
+
+        if len(remaining) == 1 or budget == len(tasks):
+            break
+
+        remaining.sort(key=lambda c: sum(utilities[c]) / len(utilities[c]), reverse=True)
+        remaining = remaining[: ceil(len(remaining) / eta)]
+        rung += 1
+
+    results = pd.DataFrame(configs)
+    results["sessions"] = [len(u) for u in utilities]
+    results["avg_utility"] = [sum(u) / len(u) if u else 0.0 for u in utilities]
+    results["rung"] = rungs
+    results.sort_values(["rung", "avg_utility"], ascending=False, inplace=True)
+
+    return results
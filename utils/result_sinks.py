@@ -0,0 +1,132 @@
+import importlib.util
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+# the Parquet sink is optional, as it needs pyarrow
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+class ResultSink(ABC):
+    """
+    Destination for the results of tournament sessions. The tournament runners call
+    `write` for every session as soon as its results are known, so a sink never has
+    to hold or serialise the results of a whole tournament at once. Sinks are
+    context managers and are closed when the context exits.
+    """
+
+    @abstractmethod
+    def write(self, key: str, settings: dict, summary: dict):
+        """Writes the results of a single session.
+
+        Args:
+            key (str): key of the session, see `SessionJournal.session_key`
+            settings (dict): session settings
+            summary (dict): results summary of the session
+        """
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonlResultSink(ResultSink):
+    """
+    Appends every session as one compact JSON line (key, settings and summary)
+    while the tournament is running. The file is flushed after every line, so it
+    can be followed and analysed before the tournament is done.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, key: str, settings: dict, summary: dict):
+        entry = {"key": key, "settings": settings, "summary": summary}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultSink(ResultSink):
+    """
+    Collects one flat row per session (see `result_row`) and writes them to a
+    Parquet file with typed columns when the sink is closed. Requires `pyarrow`.
+    """
+
+    def __init__(self, path):
+        # fail before the tournament starts instead of after it finished
+        if not PARQUET_AVAILABLE:
+            raise ImportError("ParquetResultSink requires pyarrow, install it with `pip install pyarrow`")
+
+        self.path = Path(path)
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True)
+        self.rows: List[dict] = []
+
+    def write(self, key: str, settings: dict, summary: dict):
+        self.rows.append(result_row(key, settings, summary))
+
+    def close(self):
+        results = pd.DataFrame(self.rows)
+        if "result" in results:
+            results["result"] = results["result"].astype("category")
+        results.to_parquet(self.path, index=False)
+
+
+def result_row(key: str, settings: dict, summary: dict) -> dict:
+    """Flattens the settings and results summary of a session to a single row.
+
+    The `agent_<position>` and `utility_<position>` entries of the summary are
+    numbered by party id, which differs per session. In the row they are
+    renamed to the side of the agent in the session settings (`a` or `b`), so
+    that all sessions share the same columns.
+
+    Args:
+        key (str): key of the session, see `SessionJournal.session_key`
+        settings (dict): session settings
+        summary (dict): results summary of the session
+
+    Returns:
+        dict: flat row with scalar values
+    """
+    row = {"key": key}
+    for side, agent, profile in zip("ab", settings["agents"], settings["profiles"]):
+        row[f"class_{side}"] = agent["class"]
+        row[f"parameters_{side}"] = json.dumps(agent.get("parameters", {}), sort_keys=True)
+        row[f"profile_{side}"] = profile
+    for setting in ("deadline_time_ms", "deadline_rounds", "engine"):
+        row[setting] = settings.get(setting)
+
+    # parties are numbered in the order of the agents in the settings
+    positions = sorted(
+        (k.split("_", 1)[1] for k in summary if k.startswith("agent_")), key=int
+    )
+    sides = dict(zip(positions, "ab"))
+    for position, side in sides.items():
+        row[f"agent_{side}"] = summary[f"agent_{position}"]
+        row[f"utility_{side}"] = summary[f"utility_{position}"]
+    for stat in ("num_offers", "nash_product", "social_welfare", "result"):
+        row[stat] = summary.get(stat)
+
+    for desc, stat in summary.get("timing", {}).items():
+        if isinstance(stat, dict):
+            side = sides[desc.split("_", 1)[1]]
+            for agent_desc, agent_stat in stat.items():
+                row[f"timing_{side}_{agent_desc}"] = agent_stat
+        else:
+            row[f"timing_{desc}"] = stat
+
+    return row
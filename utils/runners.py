@@ -1,12 +1,13 @@
 import logging
 import shutil
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
 from itertools import permutations
 from math import factorial, prod
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
 
-import pandas as pd
 from geniusweb.profile.utilityspace.LinearAdditiveUtilitySpace import (
     LinearAdditiveUtilitySpace,
 )
@@ -22,19 +23,43 @@ from geniusweb.simplerunner.Runner import Runner
 from pyson.ObjectMapper import ObjectMapper
 from uri.uri import URI
 
+from utils.agent_loader import load_agent_class
 from utils.ask_proceed import ask_proceed
+from utils.fast_session import run_fast_session
+from utils.result_sinks import ResultSink
+from utils.session_cache import SessionCache
+from utils.session_journal import SessionJournal
+from utils.session_timing import SessionTimer
+from utils.tournament_aggregator import TournamentAggregator
+from utils.utility_arrays import trace_utilities
+
+# wall-clock limit of a session with a rounds deadline, if no time deadline is given
+DEFAULT_ROUNDS_DURATION_MS = 60000
+# maximum number of parsed profiles that are kept in memory by `get_utility_function`
+PROFILE_CACHE_SIZE = 64
 
 
 def run_session(settings) -> Tuple[dict, dict]:
     agents = settings["agents"]
     profiles = settings["profiles"]
-    deadline_time_ms = settings["deadline_time_ms"]
+    deadline_rounds = settings.get("deadline_rounds")
+    # with a rounds deadline, the time deadline only caps the wall-clock duration
+    deadline_time_ms = settings.get(
+        "deadline_time_ms", DEFAULT_ROUNDS_DURATION_MS if deadline_rounds else None
+    )
+    virtual_time = settings.get("virtual_time", False)
+    engine = settings.get("engine", "geniusweb")
+    timer = SessionTimer() if settings.get("timing", False) else None
 
     # quick and dirty checks
     assert isinstance(agents, list) and len(agents) == 2
     assert isinstance(profiles, list) and len(profiles) == 2
     assert isinstance(deadline_time_ms, int) and deadline_time_ms > 0
+    assert deadline_rounds is None or (isinstance(deadline_rounds, int) and deadline_rounds > 0)
     assert all(["class" in agent for agent in agents])
+    assert engine in ("geniusweb", "fast")
+    if virtual_time and engine != "fast":
+        raise ValueError("virtual_time is only supported by the fast engine")
 
     for agent in agents:
         if "parameters" in agent:
@@ -43,6 +68,18 @@ def run_session(settings) -> Tuple[dict, dict]:
                 if not storage_dir.exists():
                     storage_dir.mkdir(parents=True)
 
+    # NOTE: The fast engine runs both parties directly in this process, skipping
+    # the settings round-trip through geniusweb's ObjectMapper and Runner.
+    if engine == "fast":
+        with timed_session(timer, agents):
+            results_class, results_dict = run_fast_session(
+                {**settings, "deadline_time_ms": deadline_time_ms}
+            )
+        results_trace, results_summary = process_results(results_class, results_dict)
+        if timer:
+            results_summary["timing"] = timer.summary(results_dict)
+        return results_trace, results_summary
+
     # file path to uri
     profiles_uri = [f"file:{x}" for x in profiles]
 
@@ -81,10 +118,13 @@ def run_session(settings) -> Tuple[dict, dict]:
                     }
                 },
             ],
-            # "deadline": {"DeadlineRounds": {"rounds": rounds, "durationms": 60000}},
             "deadline": {"DeadlineTime": {"durationms": deadline_time_ms}},
         }
     }
+    if deadline_rounds:
+        settings_full["SAOPSettings"]["deadline"] = {
+            "DeadlineRounds": {"rounds": deadline_rounds, "durationms": deadline_time_ms}
+        }
 
     # parse settings dict to settings object
     settings_obj = ObjectMapper().parse(settings_full, NegoSettings)
@@ -111,7 +151,8 @@ def run_session(settings) -> Tuple[dict, dict]:
     runner = Runner(settings_obj, ClassPathConnectionFactory(), StopSpammingTheConsole(), 0)
 
     # run the negotiation session
-    runner.run()
+    with timed_session(timer, agents):
+        runner.run()
 
     # get results from the session in class format and dict format
     results_class: SAOPState = runner.getProtocol().getState()
@@ -119,19 +160,37 @@ def run_session(settings) -> Tuple[dict, dict]:
 
     # add utilities to the results and create a summary
     results_trace, results_summary = process_results(results_class, results_dict)
+    if timer:
+        results_summary["timing"] = timer.summary(results_dict)
 
     return results_trace, results_summary
 
 
-def run_tournament(tournament_settings: dict, ask=True) -> Tuple[list, list]:
+@contextmanager
+def timed_session(timer: Optional[SessionTimer], agents: List[dict]):
+    '''
+    Times the parties of a session with `timer` while the context is active.
+    Without a timer, the session runs uninstrumented.
+    '''
+    if timer is None:
+        yield
+        return
+
+    party_classes = [load_agent_class(agent["class"]) for agent in agents]
+
+    with timer, timer.instrument(party_classes):
+        yield
+
+
+def run_tournament(tournament_settings: dict, ask=True, workers: int = 1, journal=None, resume=False, sinks: Sequence[ResultSink] = (), cache=None) -> Tuple[list, list]:
     # create agent permutations, ensures that every agent plays against every other agent on both sides of a profile set.
     agents = tournament_settings["agents"]
     profile_sets = tournament_settings["profile_sets"]
-    deadline_time_ms = tournament_settings["deadline_time_ms"]
+    repetitions = tournament_settings.get("repetitions", 1)
 
     num_sessions = (factorial(len(agents)) // factorial(len(agents) - 2)) * len(
         profile_sets
-    )
+    ) * repetitions
     if num_sessions > 100 and ask:
         message = (
             f"WARNING: this would run {num_sessions} negotiation sessions. Proceed?"
@@ -140,39 +199,33 @@ def run_tournament(tournament_settings: dict, ask=True) -> Tuple[list, list]:
             print("Exiting script")
             exit()
 
-    tournament_results = []
     tournament_steps = []
+    session_keys = []
 
     # logger = logging.getLogger("tournament")
     # logger.setLevel(logging.WARNING)
     # count = 0
     # logger.log(logging.WARNING, 'Running normal tournament with {} sessions'.format(num_sessions))
 
-    for profiles in profile_sets:
-        # quick an dirty check
-        assert isinstance(profiles, list) and len(profiles) == 2
-        for agent_duo in permutations(agents, 2):
-            # create session settings dict
-            settings = {
-                "agents": list(agent_duo),
-                "profiles": profiles,
-                "deadline_time_ms": deadline_time_ms,
-            }
-
-            # count += 1
-            # logger.warning('[{}/{}] {} is playing against {}'.format(count, num_sessions, agent_duo[0]['class'].split('.')[-1], agent_duo[1]['class'].split('.')[-1]))
-            # run a single negotiation session
-            _, session_results_summary = run_session(settings)
-
-            # assemble results
-            tournament_steps.append(settings)
-            tournament_results.append(session_results_summary)
+    for repetition in range(repetitions):
+        for profiles in profile_sets:
+            # quick an dirty check
+            assert isinstance(profiles, list) and len(profiles) == 2
+            for agent_duo in permutations(agents, 2):
+                # create session settings dict
+                settings = session_settings(tournament_settings, list(agent_duo), profiles)
+                tournament_steps.append(settings)
+                session_keys.append(SessionJournal.session_key(settings, repetition))
+
+    tournament_results = collect_session_results(
+        tournament_steps, session_keys, workers, journal, resume, sinks=sinks, cache=cache
+    )
 
     tournament_results_summary = process_tournament_results(tournament_results)
 
     return tournament_steps, tournament_results, tournament_results_summary
 
-def run_selfish_tournament(tournament_settings: dict, play_with_itself = True, ask=True) -> Tuple[list, list]:
+def run_selfish_tournament(tournament_settings: dict, play_with_itself = True, ask=True, workers: int = 1, journal=None, resume=False, sinks: Sequence[ResultSink] = (), cache=None) -> Tuple[list, list]:
     '''
     Runs a tournament where the first agent in the settings 
     plays against all other agents, but doesn't run other agents
@@ -180,12 +233,12 @@ def run_selfish_tournament(tournament_settings: dict, play_with_itself = True, a
     '''
     agents = tournament_settings["agents"]
     profile_sets = tournament_settings["profile_sets"]
-    deadline_time_ms = tournament_settings["deadline_time_ms"]
+    repetitions = tournament_settings.get("repetitions", 1)
 
     oc_character = agents[0]
     antagonists = agents if play_with_itself else agents[1:]
 
-    num_sessions = len(antagonists) * len(profile_sets)
+    num_sessions = len(antagonists) * len(profile_sets) * repetitions
 
     if num_sessions > 100 and ask:
         message = (
@@ -195,39 +248,177 @@ def run_selfish_tournament(tournament_settings: dict, play_with_itself = True, a
             print("Exiting script")
             exit()
 
-    tournament_results = []
     tournament_steps = []
+    session_keys = []
 
     logger = logging.getLogger('selfish tournament')
     logger.log(logging.CRITICAL,f"Running selfish tournament with profiles {profile_sets} and {num_sessions} sessions")
-    count = 0
 
-    for profiles in profile_sets:
+    for repetition in range(repetitions):
+        for profiles in profile_sets:
 
-        # quick an dirty check
-        assert isinstance(profiles, list) and len(profiles) == 2
+            # quick an dirty check
+            assert isinstance(profiles, list) and len(profiles) == 2
 
-        for antagonist in antagonists:
-            # create session settings dict
-            settings = {
-                "agents": [oc_character, antagonist],
-                "profiles": profiles,
-                "deadline_time_ms": deadline_time_ms,
-            }
+            for antagonist in antagonists:
+                # create session settings dict
+                settings = session_settings(tournament_settings, [oc_character, antagonist], profiles)
+                tournament_steps.append(settings)
+                session_keys.append(SessionJournal.session_key(settings, repetition))
 
-            count += 1
-            logger.warning(f"[{count}/{num_sessions}] {oc_character['class'].split('.')[-1]} is playing against {antagonist['class'].split('.')[-1]}")
-            # run a single negotiation session
-            _, session_results_summary = run_session(settings)
-
-            # assemble results
-            tournament_steps.append(settings)
-            tournament_results.append(session_results_summary)
+    tournament_results = collect_session_results(
+        tournament_steps, session_keys, workers, journal, resume, logger, sinks, cache
+    )
 
     tournament_results_summary = process_tournament_results(tournament_results)
 
     return tournament_steps, tournament_results, tournament_results_summary
 
+def session_settings(tournament_settings: dict, agents: list, profiles: list) -> dict:
+    '''Creates the settings dict of a single session in a tournament'''
+    settings = {
+        "agents": agents,
+        "profiles": profiles,
+    }
+    for key in ("deadline_time_ms", "deadline_rounds", "virtual_time", "engine", "timing"):
+        if key in tournament_settings:
+            settings[key] = tournament_settings[key]
+
+    return settings
+
+def collect_session_results(
+    tournament_steps: List[dict],
+    session_keys: List[str],
+    workers: int = 1,
+    journal=None,
+    resume=False,
+    logger: Optional[logging.Logger] = None,
+    sinks: Sequence[ResultSink] = (),
+    cache=None,
+) -> list:
+    '''
+    Runs all tournament steps and returns their results summaries in step order.
+
+    If a `journal` path is given, every finished session is appended to it right
+    away. With `resume=True`, sessions whose key is already in the journal are
+    skipped. The returned results are read back from the journal, so a resumed
+    tournament gives the same results as one that ran in one go.
+
+    Every session is also written to the result `sinks` as soon as it is done.
+    Sessions that are skipped on resume are written first, so the sinks always
+    receive the complete tournament.
+
+    With a `cache` directory (see `SessionCache`), sessions that were played
+    before with the same agent code, parameters, profiles and deadline are taken
+    from the cache instead of being run again, and newly run sessions are added
+    to it. Sessions that ended in an error, and sessions with an agent that
+    learns in a `storage_dir`, are not cached.
+    '''
+    session_journal = SessionJournal(journal) if journal else None
+    finished = session_journal.load() if session_journal and resume else {}
+    session_cache = SessionCache(cache) if cache else None
+
+    pending = [i for i, key in enumerate(session_keys) if key not in finished]
+    if logger and finished:
+        logger.warning(f"Resuming tournament, skipping {len(session_keys) - len(pending)} finished sessions")
+
+    tournament_results = [finished.get(key) for key in session_keys]
+
+    for index, key in enumerate(session_keys):
+        if key in finished:
+            for sink in sinks:
+                sink.write(key, tournament_steps[index], finished[key])
+
+    def finish(index, session_results_summary):
+        if session_journal:
+            session_journal.append(session_keys[index], tournament_steps[index], session_results_summary)
+        for sink in sinks:
+            sink.write(session_keys[index], tournament_steps[index], session_results_summary)
+        tournament_results[index] = session_results_summary
+
+    # take the sessions that were played before from the cache
+    cache_keys = {}
+    if session_cache:
+        cache_misses = []
+        for index in pending:
+            if not session_cache.cacheable(tournament_steps[index]):
+                cache_misses.append(index)
+                continue
+            cache_keys[index] = session_cache.key(session_keys[index], tournament_steps[index])
+            cached_summary = session_cache.get(cache_keys[index])
+            if cached_summary is None:
+                cache_misses.append(index)
+            else:
+                finish(index, cached_summary)
+        if logger:
+            logger.warning(f"Reusing {len(pending) - len(cache_misses)} cached sessions")
+        pending = cache_misses
+
+    pending_steps = [tournament_steps[i] for i in pending]
+
+    for count, (index, session_results_summary) in enumerate(run_sessions(pending_steps, workers), 1):
+        index = pending[index]
+        finish(index, session_results_summary)
+        if index in cache_keys and session_results_summary["result"] != "ERROR":
+            session_cache.put(cache_keys[index], tournament_steps[index], session_results_summary)
+        if logger:
+            agent_names = [agent["class"].split(".")[-1] for agent in tournament_steps[index]["agents"]]
+            logger.warning(f"[{count}/{len(pending)}] {agent_names[0]} played against {agent_names[1]}")
+
+    # rebuild the results from the journal, which is the source of truth
+    if session_journal:
+        journaled = session_journal.load()
+        tournament_results = [journaled[key] for key in session_keys]
+
+    return tournament_results
+
+def run_sessions(sessions: List[dict], workers: int = 1) -> Iterator[Tuple[int, dict]]:
+    '''
+    Runs a list of session settings and yields `(index, results_summary)` tuples
+    as soon as each session finishes. With `workers > 1` the sessions are run
+    in a process pool, so the yield order is the order of completion; the index
+    refers back to the position of the session in `sessions`.
+
+    NOTE: On platforms that spawn rather than fork processes (Windows, macOS)
+    the calling script needs an `if __name__ == "__main__":` guard.
+
+    NOTE: All sessions of an agent share its `storage_dir`, also between workers.
+    The agents that save through `AgentStorage` lock their files, other agents may
+    see each other's partial writes. With `workers > 1` the order in which the
+    sessions finish is not fixed, so learning agents do not reproduce the
+    results of a serial run.
+    '''
+    assert isinstance(workers, int) and workers > 0
+
+    if workers == 1:
+        for index, settings in enumerate(sessions):
+            _, session_results_summary = run_session(settings)
+            yield index, session_results_summary
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_run_session_worker, settings): index
+            for index, settings in enumerate(sessions)
+        }
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        except BaseException:
+            # a failing session (or a consumer that stops early) should not wait for
+            # all queued sessions to run, their results would be lost anyway
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def _run_session_worker(settings: dict) -> dict:
+    '''
+    Runs a single session inside a pool worker. Only the summary is returned, as
+    pickling full traces back to the parent is expensive.
+    '''
+    _, session_results_summary = run_session(settings)
+    return session_results_summary
+
 def process_results(results_class: SAOPState, results_dict: dict):
     # dict to translate geniusweb agent reference to Python class name
     agent_translate = {
@@ -248,6 +439,8 @@ def process_results(results_class: SAOPState, results_dict: dict):
         # iterate both action classes and dict entries
         actions_iter = zip(results_class.getActions(), results_dict["actions"])
 
+        offers = []
+        bids = []
         for action_class, action_dict in actions_iter:
             if "Offer" in action_dict:
                 offer = action_dict["Offer"]
@@ -256,19 +449,24 @@ def process_results(results_class: SAOPState, results_dict: dict):
             else:
                 continue
 
-            # add bid utility of both agents if bid is not None
+            # collect bids to compute the utility of both agents for, bid may not be None
             bid = action_class.getBid()
             if bid is None:
                 raise ValueError(
                     f"Found `None` value in sequence of actions: {action_class}"
                 )
-            else:
-                offer["utilities"] = {
-                    k: float(v.getUtility(bid)) for k, v in utility_funcs.items()
-                }
+            offers.append(offer)
+            bids.append(bid)
 
             results_summary["num_offers"] += 1
 
+        # add bid utility of both agents to all offers in one vectorized pass
+        utilities = trace_utilities(list(utility_funcs.values()), bids)
+        for offer_dict, offer_utilities in zip(offers, utilities.T):
+            offer_dict["utilities"] = {
+                k: float(u) for k, u in zip(utility_funcs.keys(), offer_utilities)
+            }
+
         # gather a summary of results
         if "Accept" in action_dict:
             utilities_final = list(offer["utilities"].values())
@@ -292,6 +490,19 @@ def process_results(results_class: SAOPState, results_dict: dict):
 
 
 def get_utility_function(profile_uri) -> LinearAdditiveUtilitySpace:
+    '''
+    Returns the parsed utility space of a profile. Parsed profiles are cached per
+    process, keyed by the profile URI and the modification time of the file, so
+    a profile is only parsed again when it changed on disk.
+    '''
+    profile_path = Path(profile_uri.split(":", 1)[-1])
+    mtime = profile_path.stat().st_mtime_ns if profile_path.exists() else None
+
+    return _load_utility_function(profile_uri, mtime)
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _load_utility_function(profile_uri, mtime) -> LinearAdditiveUtilitySpace:
     profile_connection = ProfileConnectionFactory.create(
         URI(profile_uri), StdOutReporter()
     )
@@ -301,63 +512,23 @@ def get_utility_function(profile_uri) -> LinearAdditiveUtilitySpace:
     return profile
 
 
-def process_tournament_results(tournament_results):
-    agent_result_raw = defaultdict(lambda: defaultdict(list))
-    tournament_results_summary = defaultdict(lambda: defaultdict(int))
-    for session_results in tournament_results:
-        agents = {k: v for k, v in session_results.items() if k.startswith("agent")}
-        for agent_id, agent_class in agents.items():
-            agent_result_raw[agent_class]["utility"].append(
-                session_results[f"utility_{agent_id.split('_')[1]}"]
-            )
-            agent_result_raw[agent_class]["nash_product"].append(
-                session_results["nash_product"]
-            )
-            agent_result_raw[agent_class]["social_welfare"].append(
-                session_results["social_welfare"]
-            )
-            if "num_offers" in session_results:
-                agent_result_raw[agent_class]["num_offers"].append(
-                    session_results["num_offers"]
-                )
-            tournament_results_summary[agent_class][session_results["result"]] += 1
-
-    for agent, stats in agent_result_raw.items():
-        num_session = len(stats["utility"])
-        for desc, stat in stats.items():
-            stat_average = sum(stat) / num_session
-            tournament_results_summary[agent][f"avg_{desc}"] = stat_average
-        tournament_results_summary[agent]["count"] = num_session
-
-    column_order = [
-        "avg_utility",
-        "avg_nash_product",
-        "avg_social_welfare",
-        "avg_num_offers",
-        "count",
-        "agreement",
-        "failed",
-        "ERROR",
-    ]
-    column_type = {
-        "count": int,
-        "agreement": int,
-        "failed": int,
-        "ERROR": int,
-    }
+def profile_cache_info():
+    '''Returns the hits, misses, maxsize and currsize of the profile cache'''
+    return _load_utility_function.cache_info()
 
-    # results dictionary to dataframe
-    tournament_results_summary = pd.DataFrame(tournament_results_summary).T
 
-    # clean data and types
-    tournament_results_summary = tournament_results_summary.fillna(0)
-    for column in column_order:
-        if column not in tournament_results_summary:
-            tournament_results_summary[column] = 0
-    tournament_results_summary = tournament_results_summary.astype(column_type)
+def clear_profile_cache():
+    _load_utility_function.cache_clear()
 
-    # structure dataframe
-    tournament_results_summary.sort_values("avg_utility", ascending=False, inplace=True)
-    tournament_results_summary = tournament_results_summary[column_order]
 
-    return tournament_results_summary
+def process_tournament_results(tournament_results):
+    '''
+    Summarises the results summaries of all sessions per agent. To follow the
+    standings while a tournament is running, pass a `TournamentAggregator` to the
+    tournament runners as a result sink instead.
+    '''
+    aggregator = TournamentAggregator()
+    for session_results in tournament_results:
+        aggregator.add(session_results)
+
+    return aggregator.summary()
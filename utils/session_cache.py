@@ -0,0 +1,192 @@
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# settings next to the agents and profiles that change the outcome of a session
+CACHED_SETTINGS = ("deadline_time_ms", "deadline_rounds", "virtual_time", "engine", "timing")
+
+# root of the repository, in-repo modules imported by an agent are part of its source hash
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class SessionCache:
+    """
+    Content-addressed cache of session results summaries, shared between
+    tournaments. A session is addressed by its agent classes and parameters,
+    a hash of the source code of the agents, a hash of the profile files, its
+    deadline and its repetition number. A sweep that only changes the parameters
+    of one agent thus reuses the sessions between the other agents, and changing
+    the code of an agent or a profile automatically invalidates its sessions.
+
+    The source hash covers all Python files in the package directory of an agent
+    class, and the in-repo modules they import (e.g. the template agent utils
+    used by the ANL2022 agents).
+
+    NOTE: Sessions with an agent that has a `storage_dir` are never cached (see
+    `cacheable`), as a cached session would skip the update of its learned data.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if not self.path.exists():
+            self.path.mkdir(parents=True)
+
+        self._source_hashes: Dict[str, str] = {}
+        self._file_hashes: Dict[tuple, str] = {}
+
+    def key(self, session_key: str, settings: dict) -> str:
+        """Content address of a session.
+
+        Args:
+            session_key (str): key of the session, see `SessionJournal.session_key`
+            settings (dict): session settings
+
+        Returns:
+            str: hex digest that addresses the session
+        """
+        content = {
+            "session": session_key,
+            "sources": [self.source_hash(agent["class"]) for agent in settings["agents"]],
+            "profiles": [self.file_hash(profile) for profile in settings["profiles"]],
+            "settings": {k: settings[k] for k in CACHED_SETTINGS if k in settings},
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def cacheable(settings: dict) -> bool:
+        """Whether a session can be cached: it may not have an agent that learns
+        in a `storage_dir`, as that agent has to play every session"""
+        return not any("storage_dir" in agent.get("parameters", {}) for agent in settings["agents"])
+
+    def get(self, key: str) -> Optional[dict]:
+        """Results summary of a cached session, or None if it is not cached"""
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            return None
+
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                return json.load(f)["summary"]
+        except (json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key: str, settings: dict, summary: dict):
+        """Stores the results summary of a session. The entry is written to a
+        temporary file first, so concurrent readers never see a partial entry.
+
+        Args:
+            key (str): content address of the session, see `key`
+            settings (dict): session settings
+            summary (dict): results summary of the session
+        """
+        entry_path = self._entry_path(key)
+        if not entry_path.parent.exists():
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "summary": summary}, f)
+        os.replace(tmp_path, entry_path)
+
+    def source_hash(self, class_path: str) -> str:
+        """Hash of all Python files in the package directory of an agent class,
+        and of the in-repo modules that they (transitively) import"""
+        module_name = class_path.rsplit(".", 1)[0]
+        if module_name not in self._source_hashes:
+            spec = importlib.util.find_spec(module_name)
+            if spec is None or spec.origin is None:
+                raise ValueError(f"Can not find the source of {class_path}")
+
+            package_dir = Path(spec.origin).resolve().parent
+            sources = set(package_dir.rglob("*.py"))
+            queue = list(sources)
+            while queue:
+                for imported in _imported_sources(queue.pop()):
+                    if imported not in sources:
+                        sources.add(imported)
+                        queue.append(imported)
+
+            digest = hashlib.sha256()
+            for source in sorted(sources):
+                digest.update(str(_relative_path(source, package_dir)).encode())
+                digest.update(source.read_bytes())
+            self._source_hashes[module_name] = digest.hexdigest()
+
+        return self._source_hashes[module_name]
+
+    def file_hash(self, file_path) -> str:
+        """Hash of the contents of a file, cached by path and modification time"""
+        file_path = Path(file_path)
+        cache_key = (str(file_path), file_path.stat().st_mtime_ns)
+        if cache_key not in self._file_hashes:
+            self._file_hashes[cache_key] = hashlib.sha256(file_path.read_bytes()).hexdigest()
+
+        return self._file_hashes[cache_key]
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path.joinpath(key[:2], f"{key}.json")
+
+
+def _relative_path(source: Path, package_dir: Path) -> Path:
+    if source.is_relative_to(REPO_ROOT):
+        return source.relative_to(REPO_ROOT)
+    return source.relative_to(package_dir)
+
+
+def _imported_sources(source: Path) -> Iterator[Path]:
+    """Source files of the in-repo modules (and their packages) imported by a
+    Python file"""
+    try:
+        tree = ast.parse(source.read_bytes(), filename=str(source))
+    except (SyntaxError, ValueError):
+        return
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            module_names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = _absolute_module(source, node.module, node.level)
+            if base is None:
+                continue
+            # `from package import name` may import the module `package.name`
+            module_names = [base] + [f"{base}.{alias.name}" for alias in node.names]
+        else:
+            continue
+
+        for module_name in module_names:
+            yield from _module_sources(module_name)
+
+
+def _absolute_module(source: Path, module: Optional[str], level: int) -> Optional[str]:
+    if level == 0:
+        return module
+    if not source.is_relative_to(REPO_ROOT):
+        return None
+
+    package_parts = list(source.relative_to(REPO_ROOT).parent.parts)
+    if level - 1 > len(package_parts):
+        return None
+    package_parts = package_parts[:len(package_parts) - (level - 1)]
+    parts = package_parts + (module.split(".") if module else [])
+    return ".".join(parts) if parts else None
+
+
+def _module_sources(module_name: str) -> List[Path]:
+    """Source files of an in-repo module and the packages it is part of, or
+    nothing if the module is not in the repository"""
+    sources = []
+    path = REPO_ROOT
+    for part in module_name.split("."):
+        path = path.joinpath(part)
+        if path.joinpath("__init__.py").is_file():
+            sources.append(path.joinpath("__init__.py"))
+        elif path.with_suffix(".py").is_file():
+            sources.append(path.with_suffix(".py"))
+            break
+        elif not path.is_dir():
+            break
+    return sources
@@ -0,0 +1,79 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict
+
+
+class SessionJournal:
+    """
+    Append-only JSONL journal of finished negotiation sessions. Every line holds
+    the key of the session, its settings and its results summary, and is flushed
+    to disk as soon as the session is done. A crashed or interrupted tournament
+    can therefore be resumed by skipping the sessions that are already in here.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True)
+
+        # terminate a partially written last line, so that new entries start on their own line
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+
+    @staticmethod
+    def session_key(settings: dict, repetition: int = 0) -> str:
+        """Key that identifies a session by its agent pair, profile pair and repetition.
+
+        Args:
+            settings (dict): session settings as passed to `run_session`
+            repetition (int, optional): repetition number of this session. Defaults to 0.
+
+        Returns:
+            str: key of the session
+        """
+        agents = [
+            [agent["class"], agent.get("parameters", {})] for agent in settings["agents"]
+        ]
+        return json.dumps(
+            [agents, list(settings["profiles"]), repetition], sort_keys=True
+        )
+
+    def load(self) -> Dict[str, dict]:
+        """Reads all session summaries in the journal. If a key occurs more than
+        once, the last entry wins. A partially written last line (e.g. after a crash)
+        is ignored.
+
+        Returns:
+            Dict[str, dict]: session key -> results summary
+        """
+        summaries = {}
+        if not self.path.exists():
+            return summaries
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                summaries[entry["key"]] = entry["summary"]
+
+        return summaries
+
+    def append(self, key: str, settings: dict, summary: dict):
+        """Appends a finished session to the journal and flushes it to disk.
+
+        Args:
+            key (str): key of the session, see `session_key`
+            settings (dict): session settings
+            summary (dict): results summary of the session
+        """
+        entry = {"key": key, "settings": settings, "summary": summary}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
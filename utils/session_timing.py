@@ -0,0 +1,142 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterable, List
+
+import numpy as np
+from geniusweb.inform.Inform import Inform
+from geniusweb.inform.Settings import Settings
+from geniusweb.inform.YourTurn import YourTurn
+
+
+class SessionTimer:
+    """
+    Records how long the parties of a session spend in `notifyChange`. The time a
+    party spends on a `YourTurn` is its turn latency: the agents in this repository
+    send their action from within `notifyChange`, so this is the time from being
+    asked to act until the action is sent. Time spent on all other informs
+    (Settings, ActionDone, Finished) is counted as inform handling time.
+    """
+
+    def __init__(self):
+        self.turn_times: Dict[str, List[float]] = defaultdict(list)
+        self.inform_times: Dict[str, float] = defaultdict(float)
+        self.start = None
+        self.end = None
+
+        # parties are only known by their id after they received their Settings
+        self._party_ids: Dict[int, str] = {}
+        self._active = set()
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.end = perf_counter()
+
+    def record(self, party, data: Inform, seconds: float):
+        """Registers the time that a party spent handling an inform.
+
+        Args:
+            party: the party that handled the inform
+            data (Inform): the inform
+            seconds (float): wall-clock time spent in `notifyChange`
+        """
+        if isinstance(data, Settings):
+            self._party_ids[id(party)] = str(data.getID())
+        party_id = self._party_ids.get(id(party))
+        if party_id is None:
+            return
+
+        if isinstance(data, YourTurn):
+            self.turn_times[party_id].append(seconds)
+        else:
+            self.inform_times[party_id] += seconds
+
+    @contextmanager
+    def instrument(self, party_classes: Iterable[type]):
+        """Wraps `notifyChange` of the party classes while the context is active, so
+        that every party of these classes reports its handling times to this timer.
+        Patching the classes works for every engine, as it does not depend on how
+        the parties are created and connected.
+
+        Args:
+            party_classes (Iterable[type]): classes of the parties in the session
+        """
+        originals = {}
+        for party_class in set(party_classes):
+            originals[party_class] = party_class.__dict__.get("notifyChange")
+            party_class.notifyChange = self._timed(party_class.notifyChange)
+
+        try:
+            yield self
+        finally:
+            for party_class, original in originals.items():
+                if original is None:
+                    del party_class.notifyChange
+                else:
+                    party_class.notifyChange = original
+
+    def _timed(self, notify_change):
+        timer = self
+
+        def timed_notify_change(party, data: Inform):
+            # a patched subclass calling a patched base class is timed only once
+            if id(party) in timer._active:
+                return notify_change(party, data)
+
+            timer._active.add(id(party))
+            start = perf_counter()
+            try:
+                return notify_change(party, data)
+            finally:
+                timer.record(party, data, perf_counter() - start)
+                timer._active.discard(id(party))
+
+        return timed_notify_change
+
+    def summary(self, results_dict: dict) -> dict:
+        """Timing summary of the session, with turn latencies in milliseconds per
+        agent position (like the `agent_<position>` keys of the results summary).
+
+        Args:
+            results_dict (dict): dict representation of the session state
+
+        Returns:
+            dict: timing summary
+        """
+        end = self.end if self.end is not None else perf_counter()
+        duration = end - self.start
+        actions = results_dict["actions"]
+        connections = results_dict["connections"]
+
+        # a round is finished when every party acted once
+        rounds = len(actions) / len(connections)
+        timing = {
+            "duration_ms": duration * 1000,
+            "rounds_per_sec": rounds / duration if duration > 0 else 0.0,
+        }
+
+        for party_id in connections:
+            position = party_id.split("_")[-1]
+            turn_times = np.array(self.turn_times.get(party_id, [])) * 1000
+            turn_total = float(turn_times.sum())
+            offers = sum(
+                1
+                for action in actions
+                if "Offer" in action and action["Offer"]["actor"] == party_id
+            )
+            has_turns = len(turn_times) > 0
+            timing[f"agent_{position}"] = {
+                "turns": len(turn_times),
+                "offers": offers,
+                "turn_p50_ms": float(np.percentile(turn_times, 50)) if has_turns else 0.0,
+                "turn_p95_ms": float(np.percentile(turn_times, 95)) if has_turns else 0.0,
+                "turn_max_ms": float(turn_times.max()) if has_turns else 0.0,
+                "turn_total_ms": turn_total,
+                "inform_ms": self.inform_times.get(party_id, 0.0) * 1000,
+                "offers_per_sec": offers / (turn_total / 1000) if turn_total > 0 else 0.0,
+            }
+
+        return timing
@@ -0,0 +1,130 @@
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+from utils.result_sinks import ResultSink
+
+COLUMN_ORDER = [
+    "avg_utility",
+    "avg_nash_product",
+    "avg_social_welfare",
+    "avg_num_offers",
+    "count",
+    "agreement",
+    "failed",
+    "ERROR",
+]
+TIMING_COLUMNS = ["avg_turn_p50_ms", "avg_turn_p95_ms", "max_turn_ms", "offers_per_sec"]
+COLUMN_TYPE = {
+    "count": int,
+    "agreement": int,
+    "failed": int,
+    "ERROR": int,
+}
+
+
+class TournamentAggregator(ResultSink):
+    """
+    Keeps running sums and counts per agent over session results summaries.
+    Adding a session costs O(1) per agent, and `summary` gives the standings of
+    all sessions added so far, so partial results of a running tournament can be
+    reported without going over all sessions again. As a `ResultSink`, it can be
+    passed to the tournament runners directly. `add` and `summary` are guarded
+    by a lock, so `summary` can be called from another thread while results
+    are streamed in.
+    """
+
+    def __init__(self):
+        self.num_sessions = 0
+
+        # agent class -> description -> running value
+        self._sums = defaultdict(lambda: defaultdict(int))
+        self._counts = defaultdict(int)
+        self._results = defaultdict(lambda: defaultdict(int))
+        self._timing_sums = defaultdict(lambda: defaultdict(int))
+        self._timing_counts = defaultdict(int)
+        self._max_turn_ms = {}
+        self._lock = threading.Lock()
+
+    def write(self, key: str, settings: dict, summary: dict):
+        self.add(summary)
+
+    def add(self, session_results: dict):
+        """Adds the results summary of a single session to the standings.
+
+        Args:
+            session_results (dict): results summary of a session, see `process_results`
+        """
+        with self._lock:
+            self.num_sessions += 1
+
+            agents = {k: v for k, v in session_results.items() if k.startswith("agent")}
+            for agent_id, agent_class in agents.items():
+                sums = self._sums[agent_class]
+                sums["utility"] += session_results[f"utility_{agent_id.split('_')[1]}"]
+                sums["nash_product"] += session_results["nash_product"]
+                sums["social_welfare"] += session_results["social_welfare"]
+                if "num_offers" in session_results:
+                    sums["num_offers"] += session_results["num_offers"]
+                self._counts[agent_class] += 1
+                self._results[agent_class][session_results["result"]] += 1
+
+                # sessions that ran with `timing` enabled also report turn latencies
+                if "timing" in session_results and agent_id in session_results["timing"]:
+                    timing = session_results["timing"][agent_id]
+                    timing_sums = self._timing_sums[agent_class]
+                    for desc in ("turn_p50_ms", "turn_p95_ms", "turn_total_ms", "offers"):
+                        timing_sums[desc] += timing[desc]
+                    self._timing_counts[agent_class] += 1
+                    self._max_turn_ms[agent_class] = max(
+                        self._max_turn_ms.get(agent_class, timing["turn_max_ms"]),
+                        timing["turn_max_ms"],
+                    )
+
+    def summary(self) -> pd.DataFrame:
+        """Standings of all sessions added so far, one row per agent class sorted
+        on average utility.
+
+        Returns:
+            pd.DataFrame: tournament results summary
+        """
+        with self._lock:
+            tournament_results_summary = defaultdict(lambda: defaultdict(int))
+            for agent, results in self._results.items():
+                tournament_results_summary[agent].update(results)
+
+            for agent, sums in self._sums.items():
+                num_session = self._counts[agent]
+                for desc, stat in sums.items():
+                    tournament_results_summary[agent][f"avg_{desc}"] = stat / num_session
+                tournament_results_summary[agent]["count"] = num_session
+
+            # percentiles can not be combined exactly, so the session percentiles are averaged
+            for agent, timing_sums in self._timing_sums.items():
+                num_session = self._timing_counts[agent]
+                turn_total_sec = timing_sums["turn_total_ms"] / 1000
+                tournament_results_summary[agent]["avg_turn_p50_ms"] = timing_sums["turn_p50_ms"] / num_session
+                tournament_results_summary[agent]["avg_turn_p95_ms"] = timing_sums["turn_p95_ms"] / num_session
+                tournament_results_summary[agent]["max_turn_ms"] = self._max_turn_ms[agent]
+                tournament_results_summary[agent]["offers_per_sec"] = (
+                    timing_sums["offers"] / turn_total_sec if turn_total_sec > 0 else 0.0
+                )
+
+            column_order = COLUMN_ORDER + (TIMING_COLUMNS if self._timing_sums else [])
+
+        # results dictionary to dataframe
+        tournament_results_summary = pd.DataFrame(tournament_results_summary).T
+
+        # clean data and types
+        tournament_results_summary = tournament_results_summary.fillna(0)
+        for column in column_order:
+            if column not in tournament_results_summary:
+                tournament_results_summary[column] = 0
+        tournament_results_summary = tournament_results_summary.astype(COLUMN_TYPE)
+
+        # structure dataframe
+        tournament_results_summary.sort_values("avg_utility", ascending=False, inplace=True)
+        tournament_results_summary = tournament_results_summary[column_order]
+
+        return tournament_results_summary
@@ -0,0 +1,117 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from geniusweb.issuevalue.Bid import Bid
+from geniusweb.issuevalue.Domain import Domain
+from geniusweb.issuevalue.Value import Value
+from geniusweb.profile.utilityspace.LinearAdditiveUtilitySpace import (
+    LinearAdditiveUtilitySpace,
+)
+
+
+def build_value_index(domain: Domain) -> Tuple[List[str], Dict[str, Dict[Value, int]]]:
+    """Assigns an integer index to every value of every issue in the domain.
+
+    Args:
+        domain (Domain): domain to index
+
+    Returns:
+        Tuple[List[str], Dict[str, Dict[Value, int]]]: sorted issues and, per issue, value -> index
+    """
+    issues = sorted(domain.getIssues())
+    value_index = {}
+    for issue in issues:
+        value_set = domain.getValues(issue)
+        value_index[issue] = {value_set.get(i): i for i in range(value_set.size())}
+
+    return issues, value_index
+
+
+def compile_profiles(
+    profiles: Sequence[LinearAdditiveUtilitySpace],
+    issues: List[str],
+    value_index: Dict[str, Dict[Value, int]],
+) -> np.ndarray:
+    """Compiles linear additive profiles to a table of weighted value utilities.
+
+    The table has shape (profiles, issues, max values + 1) and holds
+    issue weight * value utility. The last column of every issue is left at 0.0
+    and is used for values that are missing in a bid or unknown to the domain.
+
+    Args:
+        profiles (Sequence[LinearAdditiveUtilitySpace]): profiles to compile
+        issues (List[str]): issues in column order, see `build_value_index`
+        value_index (Dict[str, Dict[Value, int]]): value indices, see `build_value_index`
+
+    Returns:
+        np.ndarray: weighted utility table
+    """
+    max_values = max(len(values) for values in value_index.values())
+    table = np.zeros((len(profiles), len(issues), max_values + 1))
+
+    for p, profile in enumerate(profiles):
+        utilities = profile.getUtilities()
+        for j, issue in enumerate(issues):
+            weight = profile.getWeight(issue)
+            for value, k in value_index[issue].items():
+                table[p, j, k] = float(weight * utilities[issue].getUtility(value))
+
+    return table
+
+
+def encode_bids(
+    bids: Sequence[Bid], issues: List[str], value_index: Dict[str, Dict[Value, int]]
+) -> np.ndarray:
+    """Encodes bids as a matrix of value indices with shape (bids, issues).
+
+    Args:
+        bids (Sequence[Bid]): bids to encode
+        issues (List[str]): issues in column order, see `build_value_index`
+        value_index (Dict[str, Dict[Value, int]]): value indices, see `build_value_index`
+
+    Returns:
+        np.ndarray: encoded bids
+    """
+    missing = max(len(values) for values in value_index.values())
+    encoded = np.full((len(bids), len(issues)), missing, dtype=np.int32)
+
+    for j, issue in enumerate(issues):
+        issue_index = value_index[issue]
+        for i, bid in enumerate(bids):
+            encoded[i, j] = issue_index.get(bid.getValue(issue), missing)
+
+    return encoded
+
+
+def bid_utilities(table: np.ndarray, encoded: np.ndarray) -> np.ndarray:
+    """Computes the utility of every encoded bid for every compiled profile.
+
+    Args:
+        table (np.ndarray): weighted utility table, see `compile_profiles`
+        encoded (np.ndarray): encoded bids, see `encode_bids`
+
+    Returns:
+        np.ndarray: utilities with shape (profiles, bids)
+    """
+    issue_range = np.arange(encoded.shape[1])
+    return table[:, issue_range, encoded].sum(axis=-1)
+
+
+def trace_utilities(
+    profiles: Sequence[LinearAdditiveUtilitySpace], bids: Sequence[Bid]
+) -> np.ndarray:
+    """Utilities of a sequence of bids for all profiles, equivalent to calling
+    `float(profile.getUtility(bid))` for every profile and bid.
+
+    Args:
+        profiles (Sequence[LinearAdditiveUtilitySpace]): profiles over the same domain
+        bids (Sequence[Bid]): bids to evaluate
+
+    Returns:
+        np.ndarray: utilities with shape (profiles, bids)
+    """
+    issues, value_index = build_value_index(profiles[0].getDomain())
+    table = compile_profiles(profiles, issues, value_index)
+    encoded = encode_bids(bids, issues, value_index)
+
+    return bid_utilities(table, encoded)